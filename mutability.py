@@ -1,13 +1,49 @@
-from typing import TYPE_CHECKING
-from mutability_tvars import R, W, RK, WK, Mut_M, Mut_L
+# NOTE:
+# * This module is imported by short-lived processes, so it imports nothing
+#   at runtime: `TYPE_CHECKING` is defined here instead of being imported from
+#   `typing` (type checkers recognize it by its name).
+# * `Mut_M`, `Mut_L` and the extras (`stream`, `r_slice`, `ilist_`, ...) are
+#   loaded on first access by `__getattr__` below. `Mut_M` and `Mut_L` are in
+#   `__all__`, so `from mutability import *` loads them (and `typing`):
+#   startup-sensitive code should import the names it needs instead.
+# * Run "python mutability_importtime.py" to check the import time.
+TYPE_CHECKING = False
+
+class R: ...
+class W(R): ...
+class RK(R): ...
+class WK(W, RK): ...
 
 __all__ = [
     'R', 'W', 'RK', 'WK', 'Mut_M', 'Mut_L', 'r', 'w', 'rk', 'wk', 'lift',
-    'lift_and_w', 'lift_and_rk', 'lift_and_wk', 'restrict'
+    'lift_and_w', 'lift_and_rk', 'lift_and_wk', 'restrict', 'lifted'
 ]
 
 if TYPE_CHECKING:
     from typing import Any, Callable, overload, TypeVar
+    from mutability_tvars import Mut_M, Mut_L
+    from mutability_list import list_ as list_, list_out as list_out, \
+        list_r as list_r
+    from mutability_dict import dict_ as dict_, dict_out as dict_out, \
+        dict_r as dict_r
+    from mutability_set import set_ as set_, set_out as set_out, \
+        set_r as set_r
+    from mutability_deep import deep_r as deep_r, deep_rk as deep_rk
+    from mutability_copytrace import copy_tracing as copy_tracing, \
+        copy_budget as copy_budget
+    from mutability_dispatch import mode_dispatch as mode_dispatch
+    from mutability_freeze import frozenlist as frozenlist, \
+        frozendict as frozendict, freeze_rk as freeze_rk
+    from mutability_guard import guard as guard, \
+        ModeViolation as ModeViolation
+    from mutability_ilist import ilist_ as ilist_
+    from mutability_intern import InternPool as InternPool
+    from mutability_setexpr import set_expr as set_expr
+    from mutability_sorted import sortedlist_ as sortedlist_, \
+        sortedset_ as sortedset_, sorteddict_ as sorteddict_
+    from mutability_stream import stream as stream
+    from mutability_table import table_ as table_
+    from mutability_views import r_slice as r_slice, r_merge as r_merge
     # NOTE: importing "mutability_reg.py" here instead of at the top avoids a
     #   (runtime) circular dependence.
     from mutability_reg import do_conv, Liftable
@@ -100,6 +136,10 @@ if TYPE_CHECKING:
         __st: Callable[[FROM, R, Any], tuple[Any, TO]] = do_conv,
         ) -> TO: ...
     def restrict(*args, **kwargs) -> Any: ...
+
+    def lifted[C: type](cls: C) -> C:
+        """Makes `X_[M, L](...)` as fast as `X_(...)` at runtime."""
+        ...             # pylint: disable=W2301
 else:
     def _ident1(x):
         return x
@@ -107,3 +147,46 @@ else:
         return x
     r = rk = w = wk = lift_and_w = lift_and_rk = lift_and_wk = _ident1
     lift = restrict = _ident2
+
+    # NOTE: `Generic.__class_getitem__` returns a `typing._GenericAlias` whose
+    #   `__call__` also sets `__orig_class__` on the new instance, which
+    #   roughly doubles the construction cost and fails silently with
+    #   `__slots__`. Since `M` and `L` are only for the type checker, we just
+    #   return the class itself.
+    def _class_getitem(cls, item):
+        return cls
+    def lifted(cls):
+        cls.__class_getitem__ = classmethod(_class_getitem)
+        return cls
+
+    list_ = list_out = list_r = list
+    dict_ = dict_out = dict_r = dict
+    set_ = set_out = set_r = set
+
+    _lazy = {
+        'Mut_M': 'mutability_tvars', 'Mut_L': 'mutability_tvars',
+        'copy_tracing': 'mutability_copytrace',
+        'copy_budget': 'mutability_copytrace',
+        'deep_r': 'mutability_deep', 'deep_rk': 'mutability_deep',
+        'mode_dispatch': 'mutability_dispatch',
+        'frozenlist': 'mutability_freeze', 'frozendict': 'mutability_freeze',
+        'freeze_rk': 'mutability_freeze',
+        'guard': 'mutability_guard', 'ModeViolation': 'mutability_guard',
+        'ilist_': 'mutability_ilist',
+        'InternPool': 'mutability_intern',
+        'set_expr': 'mutability_setexpr',
+        'sortedlist_': 'mutability_sorted', 'sortedset_': 'mutability_sorted',
+        'sorteddict_': 'mutability_sorted',
+        'stream': 'mutability_stream',
+        'table_': 'mutability_table',
+        'r_slice': 'mutability_views', 'r_merge': 'mutability_views',
+    }
+
+    def __getattr__(name):
+        mod = _lazy.get(name)
+        if mod is None:
+            raise AttributeError(
+                f'module {__name__!r} has no attribute {name!r}')
+        value = getattr(__import__(mod), name)
+        globals()[name] = value         # next time, no `__getattr__`
+        return value
@@ -0,0 +1,324 @@
+from __future__ import annotations
+import sys
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from mutability import *
+
+__all__ = [
+    'CopySite', 'CopyStats', 'CopyTracer', 'CopyBudgetExceeded',
+    'copy_tracing', 'copy_budget', 'traced', 'lift_traced'
+]
+
+# NOTE:
+# * The stubs tell us exactly which operations copy: the ones returning a
+#   brand-new `X_out[..., WK]` (`copy`, `__add__`, slicing, `__or__`, `union`,
+#   `difference`, `fromkeys`, ...).
+# * At runtime `list_`, `dict_` and `set_` are just `list`, `dict` and `set`,
+#   whose methods can't be patched, so tracing only works on objects created
+#   through `traced`/`lift_traced`. Their copies are traced as well, so it's
+#   enough to wrap the values at the root of the data flow.
+# * Statically, `traced(.)` is the identity and `lift_traced` is `lift`.
+
+class CopyBudgetExceeded(Exception): ...
+
+class CopySite:
+    """Where a copy was made: `op` is the copying operation."""
+    __slots__ = ('filename', 'lineno', 'function', 'op')
+
+    def __init__(self, filename: str, lineno: int, function: str, op: str
+                 ) -> None:
+        self.filename = filename
+        self.lineno = lineno
+        self.function = function
+        self.op = op
+
+    def _key(self) -> tuple[str, int, str, str]:
+        return (self.filename, self.lineno, self.function, self.op)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CopySite) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f'{self.filename}:{self.lineno} ({self.function}) {self.op}'
+
+class CopyStats:
+    __slots__ = ('calls', 'elems', 'nbytes')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.elems = 0
+        self.nbytes = 0
+
+    def __repr__(self) -> str:
+        return (f'CopyStats(calls={self.calls}, elems={self.elems}, '
+                f'nbytes={self.nbytes})')
+
+class CopyTracer:
+    """Accumulates the copies made while it's active (see `copy_tracing`).
+
+    `nbytes` is estimated with `sys.getsizeof` on the new container, which is
+    exactly what a shallow copy allocates (the elements are shared).
+
+    If `max_bytes` or `max_elems` is given, `CopyBudgetExceeded` is raised by
+    the first copy that exceeds the budget.
+    """
+
+    def __init__(self, max_bytes: int | None = None,
+                 max_elems: int | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_elems = max_elems
+        self.total = CopyStats()
+        self.sites: dict[CopySite, CopyStats] = {}
+
+    def record(self, site: CopySite, elems: int, nbytes: int) -> None:
+        stats = self.sites.get(site)
+        if stats is None:
+            stats = self.sites[site] = CopyStats()
+        for s in (stats, self.total):
+            s.calls += 1
+            s.elems += elems
+            s.nbytes += nbytes
+        if self.max_bytes is not None and self.total.nbytes > self.max_bytes:
+            raise CopyBudgetExceeded(
+                f'{self.total.nbytes} bytes copied (budget: {self.max_bytes}),'
+                f' last copy at {site!r}')
+        if self.max_elems is not None and self.total.elems > self.max_elems:
+            raise CopyBudgetExceeded(
+                f'{self.total.elems} elements copied (budget: '
+                f'{self.max_elems}), last copy at {site!r}')
+
+    def top(self, n: int = 10, by: str = 'nbytes'
+            ) -> list[tuple[CopySite, CopyStats]]:
+        """Returns the `n` most expensive sites by `nbytes`, `elems` or
+        `calls`."""
+        items = sorted(self.sites.items(), key=lambda kv: getattr(kv[1], by),
+                       reverse=True)
+        return items[:n]
+
+    def report(self, n: int = 10, by: str = 'nbytes') -> str:
+        lines = [f'{self.total.calls} copies, {self.total.elems} elements, '
+                 f'{self.total.nbytes} bytes']
+        for site, s in self.top(n, by):
+            lines.append(f'{s.nbytes:>12} B {s.elems:>10} el {s.calls:>8} x  '
+                         f'{site!r}')
+        return '\n'.join(lines)
+
+_active: ContextVar[tuple[CopyTracer, ...]] = ContextVar('_active',
+                                                         default=())
+
+class copy_tracing:
+    """Context manager that activates `tracer` (a new one by default).
+
+    Tracers nest: a copy is recorded by all the active ones. Since the active
+    tracers are held in a `ContextVar`, each thread/task has its own.
+    """
+
+    def __init__(self, tracer: CopyTracer | None = None) -> None:
+        self.tracer = CopyTracer() if tracer is None else tracer
+
+    def __enter__(self) -> CopyTracer:
+        self._token = _active.set(_active.get() + (self.tracer,))
+        return self.tracer
+
+    def __exit__(self, *exc: object) -> None:
+        _active.reset(self._token)
+
+def copy_budget(max_bytes: int | None = None, max_elems: int | None = None
+                ) -> copy_tracing:
+    """Per-request budget: raises `CopyBudgetExceeded` as soon as the copies
+    made inside the `with` block exceed the limits."""
+    return copy_tracing(CopyTracer(max_bytes, max_elems))
+
+def _record(op: str, res: Any) -> Any:
+    tracers = _active.get()
+    if tracers:
+        # 0: _record, 1: the copying method, 2: the caller
+        # NOTE: `sys._getframe` is documented and much cheaper than `inspect`
+        f = sys._getframe(2)        # pyright: ignore[reportPrivateUsage]
+        site = CopySite(f.f_code.co_filename, f.f_lineno, f.f_code.co_name, op)
+        elems = len(res)
+        nbytes = sys.getsizeof(res)
+        for t in tracers:
+            t.record(site, elems, nbytes)
+    return res
+
+class _list_t(list[Any]):
+    __slots__ = ()
+
+    def copy(self):
+        return _record('list.copy', _list_t(self))
+
+    def __add__(self, value):
+        if not isinstance(value, list):
+            return NotImplemented
+        res = _list_t(self)
+        res.extend(value)
+        return _record('list.__add__', res)
+
+    def __radd__(self, value):
+        if not isinstance(value, list):
+            return NotImplemented
+        res = _list_t(value)
+        res.extend(self)
+        return _record('list.__radd__', res)
+
+    def __getitem__(self, s):
+        if isinstance(s, slice):
+            return _record('list.__getitem__',
+                           _list_t(list.__getitem__(self, s)))
+        return list.__getitem__(self, s)
+
+class _dict_t(dict[Any, Any]):
+    __slots__ = ()
+
+    def copy(self):
+        return _record('dict.copy', _dict_t(self))
+
+    @classmethod
+    def fromkeys(cls, *args):
+        return _record('dict.fromkeys', super().fromkeys(*args))
+
+    def __or__(self, value):
+        if not isinstance(value, dict):
+            return NotImplemented
+        res = _dict_t(self)
+        res.update(value)
+        return _record('dict.__or__', res)
+
+    def __ror__(self, value):
+        if not isinstance(value, dict):
+            return NotImplemented
+        res = _dict_t(value)
+        res.update(self)
+        return _record('dict.__ror__', res)
+
+class _set_t(set[Any]):
+    __slots__ = ()
+
+    def copy(self):
+        return _record('set.copy', _set_t(self))
+
+    def union(self, *s):
+        res = _set_t(self)
+        res.update(*s)
+        return _record('set.union', res)
+
+    def difference(self, *s):
+        return _record('set.difference', _set_t(set.difference(self, *s)))
+
+    def intersection(self, *s):
+        return _record('set.intersection', _set_t(set.intersection(self, *s)))
+
+    def symmetric_difference(self, s):
+        return _record('set.symmetric_difference',
+                       _set_t(set.symmetric_difference(self, s)))
+
+    def __or__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        res = _set_t(self)
+        res.update(value)
+        return _record('set.__or__', res)
+
+    def __and__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        return _record('set.__and__', _set_t(set.__and__(self, value)))
+
+    def __sub__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        return _record('set.__sub__', _set_t(set.__sub__(self, value)))
+
+    def __xor__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        return _record('set.__xor__', _set_t(set.__xor__(self, value)))
+
+    # NOTE: since `_set_t` overrides them, the reflected operators are called
+    #   before those of a `set` `value`, e.g. for `{2} | s` (but not for a
+    #   `frozenset` one, which isn't a base class)
+
+    def __ror__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        res = _set_t(value)
+        res.update(self)
+        return _record('set.__ror__', res)
+
+    def __rand__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        return _record('set.__rand__', _set_t(set.__and__(self, value)))
+
+    def __rsub__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        res = _set_t(value)
+        res.difference_update(self)
+        return _record('set.__rsub__', res)
+
+    def __rxor__(self, value):
+        if not isinstance(value, (set, frozenset)):
+            return NotImplemented
+        return _record('set.__rxor__', _set_t(set.__xor__(self, value)))
+
+_TRACED: dict[type, type] = {list: _list_t, dict: _dict_t, set: _set_t}
+
+if TYPE_CHECKING:
+    def traced[T](obj: T) -> T: ...
+    lift_traced = lift
+else:
+    def traced(obj):
+        """Returns a traced (shallow) copy of `obj` if it's a `list`, `dict`
+        or `set`, and `obj` itself otherwise."""
+        cls = _TRACED.get(type(obj))
+        return obj if cls is None else cls(obj)
+
+    def lift_traced(obj, m=None):
+        return traced(obj)
+
+if __name__ == "__main__":
+    from typing import assert_type
+    from mutability_list import list_
+    from mutability_dict import dict_
+
+    xs = lift_traced([1, 2, 3])
+    ds = lift_traced({'a': 1})
+    assert_type(xs, list_[int, WK, None])
+    assert_type(ds, dict_[str, int, WK, None])
+
+    with copy_tracing() as tracer:
+        ys = xs.copy()
+        zs = ys + r(xs)             # `ys` is traced too
+        _ = zs[1:]
+        _ = ds | r(lift({'b': 2}))
+        _ = xs[0]                   # not a copy
+    assert tracer.total.calls == 4
+    assert tracer.total.elems == 3 + 6 + 5 + 2
+    assert tracer.top(1, 'elems')[0][0].op == 'list.__add__'
+
+    _ = xs.copy()                   # no active tracer
+    assert tracer.total.calls == 4
+
+    # reflected operators are recorded too
+    ss, ts = traced({1, 2}), traced([1, 2, 3])
+    with copy_tracing() as tracer:
+        res = [{2} | ss, {2} & ss, {2} - ss, {3} ^ ss]
+        ys = [0] + ts
+    assert res == [{1, 2}, {2}, set(), {1, 2, 3}] and ys == [0, 1, 2, 3]
+    assert tracer.total.calls == 5
+    assert all(type(x) is _set_t for x in res) and type(ys) is _list_t
+
+    try:
+        with copy_budget(max_elems=5):
+            _ = xs.copy()
+            _ = xs.copy()
+    except CopyBudgetExceeded:
+        pass
+    else:
+        assert False
@@ -0,0 +1,390 @@
+from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING, Any
+
+from mutability import *
+from mutability_list import *
+from mutability_dict import *
+from mutability_set import *
+from mutability_guard import dict_proxy_base, proxy_base
+
+__all__ = ['deep_r', 'deep_rk', 'deep_stats']
+
+# NOTE:
+# * `r(xs)` only restricts the outer layer: in a `list_r[dict[str, int]]`
+#   the inner dicts are still writable, and making them safe used to mean a
+#   `deepcopy`, i.e. O(total size).
+# * `deep_r` and `deep_rk` are O(1) conversions that also restrict the inner
+#   containers, statically: `list_[dict[K, V], ...]` -> `list_r[dict_r[K, V]]`
+#   and so on, both for plain and lifted inner containers. Only 2 levels are
+#   typed (deeper levels keep their original types), and values that aren't
+#   nested containers are restricted like with `r` and `rk`.
+# * At runtime, they return their argument, unless `guarded=True`: then they
+#   return a guarded proxy (see "mutability_guard.py") that wraps the inner
+#   lists, dicts and sets, at any depth, when they're read (indexing,
+#   iteration, `get`, `values`, `items`, `copy`, ...). The wrappers are cached
+#   in their parent proxy, so reading the same value twice returns the same
+#   wrapper. Writing through any of them raises `ModeViolation`.
+# * As in "mutability_guard.py", the proxies of dicts (at any depth) are
+#   `dict` subclasses, so that `isinstance(p, dict)`, `json.dumps(p)` and
+#   `stream(p)` work, while the proxies of lists and sets are not instances
+#   of the proxied type.
+# * The cache of a proxy keeps the wrapped values alive, including those
+#   replaced in the owner since they were read: when it grows past twice the
+#   size of the container, the entries of such values are dropped.
+# * These proxies aren't sampled, so they aren't counted (nor limited) by
+#   the `stats` and `max_live` of "mutability_guard.py": see `deep_stats`.
+# * Run "python mutability_deep.py --bench" to compare it with `deepcopy`.
+
+_created = 0
+_live = 0
+
+def deep_stats() -> dict[str, int]:
+    """The guarded proxies created by `deep_r`/`deep_rk` (inner ones
+    included) and those still alive."""
+    return {'created': _created, 'live': _live}
+
+if TYPE_CHECKING:
+    from typing import overload
+
+    # list_ of containers
+
+    @overload
+    def deep_r[T](obj: list_[list[T], Any, Any], *, guarded: bool = False
+                  ) -> list_r[list_r[T]]: ...
+    @overload
+    def deep_r[T](obj: list_[list_[T, Any, Any], Any, Any], *,
+                  guarded: bool = False) -> list_r[list_r[T]]: ...
+    @overload
+    def deep_r[K, V](obj: list_[dict[K, V], Any, Any], *,
+                     guarded: bool = False) -> list_r[dict_r[K, V]]: ...
+    @overload
+    def deep_r[K, V](obj: list_[dict_[K, V, Any, Any], Any, Any], *,
+                     guarded: bool = False) -> list_r[dict_r[K, V]]: ...
+    @overload
+    def deep_r[T](obj: list_[set[T], Any, Any], *, guarded: bool = False
+                  ) -> list_r[set_r[T]]: ...
+    @overload
+    def deep_r[T](obj: list_[set_[T, Any, Any], Any, Any], *,
+                  guarded: bool = False) -> list_r[set_r[T]]: ...
+
+    # dict_ of containers
+
+    @overload
+    def deep_r[K, T](obj: dict_[K, list[T], Any, Any], *,
+                     guarded: bool = False) -> dict_r[K, list_r[T]]: ...
+    @overload
+    def deep_r[K, T](obj: dict_[K, list_[T, Any, Any], Any, Any], *,
+                     guarded: bool = False) -> dict_r[K, list_r[T]]: ...
+    @overload
+    def deep_r[K, K2, V](obj: dict_[K, dict[K2, V], Any, Any], *,
+                         guarded: bool = False
+                         ) -> dict_r[K, dict_r[K2, V]]: ...
+    @overload
+    def deep_r[K, K2, V](obj: dict_[K, dict_[K2, V, Any, Any], Any, Any], *,
+                         guarded: bool = False
+                         ) -> dict_r[K, dict_r[K2, V]]: ...
+    @overload
+    def deep_r[K, T](obj: dict_[K, set[T], Any, Any], *,
+                     guarded: bool = False) -> dict_r[K, set_r[T]]: ...
+    @overload
+    def deep_r[K, T](obj: dict_[K, set_[T, Any, Any], Any, Any], *,
+                     guarded: bool = False) -> dict_r[K, set_r[T]]: ...
+
+    # 1 level
+
+    @overload
+    def deep_r[T](obj: list_[T, Any, Any], *, guarded: bool = False
+                  ) -> list_r[T]: ...
+    @overload
+    def deep_r[K, V](obj: dict_[K, V, Any, Any], *, guarded: bool = False
+                     ) -> dict_r[K, V]: ...
+    @overload
+    def deep_r[T](obj: set_[T, Any, Any], *, guarded: bool = False
+                  ) -> set_r[T]: ...
+    def deep_r(obj: Any, *, guarded: bool = False) -> Any: ...
+
+    # NOTE: Like `rk`, `deep_rk` requires RK (or WK) values, including the
+    #   lifted inner ones.
+
+    type _list_rk[T] = list_[T, RK, Any]
+    type _dict_rk[K, V] = dict_[K, V, RK, Any]
+    type _set_rk[T] = set_[T, RK, Any]
+
+    # list_ of containers
+
+    @overload
+    def deep_rk[T](obj: list_[list[T], RK, Any], *, guarded: bool = False
+                   ) -> _list_rk[_list_rk[T]]: ...
+    @overload
+    def deep_rk[T](obj: list_[list_[T, RK, Any], RK, Any], *,
+                   guarded: bool = False) -> _list_rk[_list_rk[T]]: ...
+    @overload
+    def deep_rk[K, V](obj: list_[dict[K, V], RK, Any], *,
+                      guarded: bool = False) -> _list_rk[_dict_rk[K, V]]: ...
+    @overload
+    def deep_rk[K, V](obj: list_[dict_[K, V, RK, Any], RK, Any], *,
+                      guarded: bool = False) -> _list_rk[_dict_rk[K, V]]: ...
+    @overload
+    def deep_rk[T](obj: list_[set[T], RK, Any], *, guarded: bool = False
+                   ) -> _list_rk[_set_rk[T]]: ...
+    @overload
+    def deep_rk[T](obj: list_[set_[T, RK, Any], RK, Any], *,
+                   guarded: bool = False) -> _list_rk[_set_rk[T]]: ...
+
+    # dict_ of containers
+
+    @overload
+    def deep_rk[K, T](obj: dict_[K, list[T], RK, Any], *,
+                      guarded: bool = False) -> _dict_rk[K, _list_rk[T]]: ...
+    @overload
+    def deep_rk[K, T](obj: dict_[K, list_[T, RK, Any], RK, Any], *,
+                      guarded: bool = False) -> _dict_rk[K, _list_rk[T]]: ...
+    @overload
+    def deep_rk[K, K2, V](obj: dict_[K, dict[K2, V], RK, Any], *,
+                          guarded: bool = False
+                          ) -> _dict_rk[K, _dict_rk[K2, V]]: ...
+    @overload
+    def deep_rk[K, K2, V](obj: dict_[K, dict_[K2, V, RK, Any], RK, Any], *,
+                          guarded: bool = False
+                          ) -> _dict_rk[K, _dict_rk[K2, V]]: ...
+    @overload
+    def deep_rk[K, T](obj: dict_[K, set[T], RK, Any], *,
+                      guarded: bool = False) -> _dict_rk[K, _set_rk[T]]: ...
+    @overload
+    def deep_rk[K, T](obj: dict_[K, set_[T, RK, Any], RK, Any], *,
+                      guarded: bool = False) -> _dict_rk[K, _set_rk[T]]: ...
+
+    # 1 level
+
+    @overload
+    def deep_rk[T](obj: list_[T, RK, Any], *, guarded: bool = False
+                   ) -> _list_rk[T]: ...
+    @overload
+    def deep_rk[K, V](obj: dict_[K, V, RK, Any], *, guarded: bool = False
+                      ) -> _dict_rk[K, V]: ...
+    @overload
+    def deep_rk[T](obj: set_[T, RK, Any], *, guarded: bool = False
+                   ) -> _set_rk[T]: ...
+    def deep_rk(obj: Any, *, guarded: bool = False) -> Any: ...
+else:
+    _CONTAINERS = (list, dict, set)
+
+    class _deep_base(proxy_base):
+        __slots__ = ()
+
+        def __init__(self, obj):
+            global _created, _live
+            super().__init__(obj)
+            object.__setattr__(self, '_cache', None)
+            _created += 1
+            _live += 1
+
+        def __del__(self):
+            global _live
+            _live -= 1
+
+        def _wrap(self, x):
+            if not isinstance(x, _CONTAINERS):
+                return x
+            cache = self._cache
+            if cache is None:
+                cache = {}
+                object.__setattr__(self, '_cache', cache)
+            else:
+                p = cache.get(id(x))
+                if p is not None:
+                    return p
+                if len(cache) >= 2 * len(self._obj) + 8:
+                    self._prune()
+                    cache = self._cache
+            p = cache[id(x)] = _new_proxy(x)
+            return p
+
+        def _prune(self):
+            # NOTE: the cache keeps the values it wraps alive, so their ids
+            #   can't be reused, but the values replaced in the owner would
+            #   stay alive as long as this proxy
+            obj = self._obj
+            ids = {id(v) for v in (obj.values() if isinstance(obj, dict)
+                                   else obj)}
+            object.__setattr__(self, '_cache', {
+                i: p for i, p in self._cache.items() if i in ids
+            })
+
+        def __getitem__(self, key):
+            if isinstance(key, slice):
+                return list(map(self._wrap, self._obj[key]))
+            return self._wrap(self._obj[key])
+
+        def __getattr__(self, name):
+            f = _DEEP_METHODS.get(name)
+            if f is not None and hasattr(type(self._obj), name):
+                return f.__get__(self)
+            return super().__getattr__(name)
+
+    class _deep_proxy(_deep_base):
+        __slots__ = ('_obj', '_cache', '__weakref__')
+
+    class _deep_dict_proxy(_deep_base, dict_proxy_base):
+        __slots__ = ('_obj', '_cache', '__weakref__')
+
+    def _new_proxy(obj):
+        if isinstance(obj, dict):
+            return _deep_dict_proxy(obj)
+        return _deep_proxy(obj)
+
+    class _deep_values:
+        __slots__ = ('_p',)
+
+        def __init__(self, p):
+            self._p = p
+
+        def __len__(self):
+            return len(self._p._obj)
+
+        def __iter__(self):
+            return map(self._p._wrap, self._p._obj.values())
+
+    class _deep_items(_deep_values):
+        __slots__ = ()
+
+        def __iter__(self):
+            wrap = self._p._wrap
+            return ((k, wrap(v)) for k, v in self._p._obj.items())
+
+    def _get(self, key, default=None):
+        obj = self._obj
+        return self._wrap(obj[key]) if key in obj else default
+
+    def _values(self):
+        return _deep_values(self)
+
+    def _items(self):
+        return _deep_items(self)
+
+    def _copy(self):
+        # NOTE: a copy is WK, but its elements are still R
+        obj = self._obj
+        if isinstance(obj, dict):
+            return {k: self._wrap(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return list(map(self._wrap, obj))
+        return obj.copy()
+
+    _DEEP_METHODS = {
+        'get': _get, 'values': _values, 'items': _items, 'copy': _copy,
+    }
+
+    def deep_r(obj, *, guarded=False):
+        if guarded and isinstance(obj, _CONTAINERS):
+            return _new_proxy(obj)
+        return obj
+
+    deep_rk = deep_r
+
+def _bench(sizes: tuple[int, ...] = (100, 10_000, 100_000)) -> None:
+    from copy import deepcopy
+    from time import perf_counter
+
+    print(f'{"rows":>8} {"deepcopy (ms)":>14} {"guarded (ms)":>13} '
+          f'{"static (ms)":>12}')
+    for n in sizes:
+        data = lift([{'id': i, 'tags': [i, i + 1]} for i in range(n)])
+
+        def read(xs: Any) -> None:
+            for i in range(0, n, max(1, n // 100)):     # 100 rows are read
+                xs[i]['tags'][0]
+
+        times: list[float] = []
+        for f in (lambda: deepcopy(data), lambda: deep_r(data, guarded=True),
+                  lambda: deep_r(data)):
+            t = perf_counter()
+            read(f())
+            times.append((perf_counter() - t) * 1e3)
+        print(f'{n:>8} {times[0]:>14.2f} {times[1]:>13.3f} {times[2]:>12.3f}')
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--bench']:
+        _bench()
+    else:
+        from typing import assert_type
+        from mutability_guard import ModeViolation
+
+        xs = lift([{'a': [1, 2]}, {'b': [3]}])
+        xs_r = deep_r(xs)
+        assert_type(xs_r, list_r[dict_r[str, list[int]]])
+        assert xs_r is xs
+
+        ds = lift({'k': lift([1, 2], RK)}, RK)
+        assert_type(deep_rk(ds), dict_[str, list_[int, RK, Any], RK, Any])
+
+        ys = deep_r(xs, guarded=True)
+        assert ys == xs and len(ys) == 2
+        assert ys[0] is ys[0] and ys[0]['a'] is ys[0]['a']     # cached
+        assert ys[0]['a'][1] == 2 and list(ys[1]['b']) == [3]
+        assert [list(v) for v in ys[0].values()] == [[1, 2]]
+        assert not hasattr(ys, 'values') and ys[0].get('z') is None
+        # NOTE: the 3rd level (e.g. `ys[0]['a']`) is only restricted at
+        #   runtime
+        bad_ops = [
+            lambda: ys.append({}),                      # pyright: ignore
+            lambda: ys[0].update(c=[]),                 # pyright: ignore
+            lambda: ys[0]['a'].append(3),
+            lambda: ys[0].get('a').append(3),           # pyright: ignore
+            lambda: next(iter(ys[1].values())).sort(),
+            lambda: [v for _, v in ys[0].items()][0].clear(),
+            lambda: ys.copy()[0].clear(),               # pyright: ignore
+            lambda: ys[:1][0].clear(),                  # pyright: ignore
+        ]
+        for bad in bad_ops:
+            try:
+                bad()
+            except ModeViolation:
+                pass
+            else:
+                assert False
+        assert xs == [{'a': [1, 2]}, {'b': [3]}]
+
+        # the inner values are still writable through the owner
+        w(xs)[0]['a'] = [7]
+        assert list(ys[0]['a']) == [7]
+
+        # the cache doesn't keep all the replaced values alive
+        import weakref
+        class _V(list[int]): ...
+        refs: list[weakref.ref[_V]] = []
+        for i in range(100):
+            v = _V([i])
+            refs.append(weakref.ref(v))
+            w(xs)[0]['a'] = v
+            assert list(ys[0]['a']) == [i]
+        assert sum(r() is not None for r in refs) < 20
+
+        # the proxies of dicts are dicts, at any depth
+        import json
+        from mutability_stream import stream
+        ms = lift({'a': {'b': {'c': 1}}, 'd': {}})
+        ps = deep_r(ms, guarded=True)
+        assert isinstance(ps, dict) and isinstance(ps['a']['b'], dict)
+        assert json.loads(json.dumps(ps)) == ms
+        assert stream(ps).to_dict() == ms and dict(ps['a']) == ms['a']
+        assert ps.copy()['a'] is ps['a'] and ps.get('a') is ps['a']
+        try:
+            ps['a']['b'].update(c=2)    # only restricted at runtime
+        except ModeViolation:
+            pass
+        else:
+            assert False
+        assert ms['a']['b'] == {'c': 1}
+
+        # deep proxies have their own accounting
+        from mutability_guard import stats
+        assert deep_stats()['live'] > 1 and stats()['guarded'] == 0
+        del ys, bad_ops, ps
+        assert deep_stats()['live'] == 0
+
+        wrong = False
+        if wrong:
+            xs_r[0]['c'] = []           # type: ignore      read-only
+            deep_rk(xs_r)               # type: ignore      needs RK or WK
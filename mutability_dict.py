@@ -1,7 +1,8 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, assert_type, Literal as L, Any
-from mutability import *
-
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+    from mutability import *
 
 __all__ = ['dict_', 'dict_out', 'dict_r']
 
@@ -138,6 +139,9 @@ else:
     dict_ = dict_out = dict_r = dict
 
 if __name__ == "__main__":
+    from typing import assert_type, Literal as L, Any
+    from mutability import *
+
     a = lift({'a': 1, 'b': 2, 'c': 3})
     a_r = r(a)
     a_w = w(a)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import functools
+import inspect
+import types
+import typing
+from typing import TYPE_CHECKING, Any, Callable, Union, get_overloads
+
+from mutability_guard import proxy_base
+from mutability_views import list_view, merged_view
+
+__all__ = ['mode_dispatch']
+
+# NOTE:
+# * At runtime, `list_`, `dict_` and `set_` are `list`, `dict` and `set`, so
+#   functions overloaded across lifted types end up with `isinstance` chains.
+# * With `@mode_dispatch`, the bodies of the `@overload`s ARE the
+#   implementations and the decorated function is the fallback (usually it
+#   just raises `TypeError`):
+#
+#       @overload
+#       def doubled(xs: list_r[int]) -> list_out[int, WK]:
+#           return lift([x * 2 for x in xs])
+#       @overload
+#       def doubled[K](xs: dict_r[K, int]) -> dict_out[K, int, WK]:
+#           return lift({k: v * 2 for k, v in xs.items()})
+#       @mode_dispatch
+#       def doubled(xs: Any) -> Any:
+#           raise TypeError(...)
+#
+# * The overload is chosen by the runtime class of the first argument: only
+#   the outer class of its annotation matters (`list_r[int]` -> `list`,
+#   `A_[W, _L]` -> `A_`, `X | Y` -> both), since modes, locks and type
+#   arguments don't exist at runtime. So the annotations may refer to locks
+#   that can't be resolved anymore (e.g. defined inside a function), but not
+#   to unresolvable outer classes. The first matching overload wins.
+# * The R views of "mutability_views.py" are dispatched as the class they
+#   stand for (`r_slice` -> `list`, `r_merge` -> `dict`), and the proxies of
+#   "mutability_guard.py" as the class of the proxied object.
+# * The table from concrete classes to implementations is built on the first
+#   call and then extended with each new class (e.g. subclasses), so a call
+#   costs a single dict lookup.
+
+_VIEWS: dict[type, type] = {list_view: list, merged_view: dict}
+
+class _Unknown:
+    """Stands for the names an annotation can't resolve."""
+    def __class_getitem__(cls, item: Any) -> type[_Unknown]:
+        return cls
+
+def _eval_annotation(ann: Any, func: Callable[..., Any]) -> Any:
+    if not isinstance(ann, str):
+        return ann
+    ns: dict[str, Any] = {
+        p.__name__: p for p in getattr(func, '__type_params__', ())
+    }
+    while True:
+        try:
+            res = eval(ann, func.__globals__, ns)   # pylint: disable=W0123
+            break
+        except NameError as e:
+            # e.g. locks defined inside a function: only the outer classes
+            #   matter, so the missing names can stand for anything
+            name = e.name
+            if name is None or name in ns:
+                raise
+            ns[name] = type(name, (_Unknown,), {})
+    return _eval_annotation(res, func)      # quoted annotations
+
+def _runtime_classes(ann: Any) -> tuple[type, ...]:
+    origin = typing.get_origin(ann)
+    if origin is Union or origin is types.UnionType:
+        return tuple(c for a in typing.get_args(ann)
+                     for c in _runtime_classes(a))
+    if origin is not None:
+        ann = origin
+    if isinstance(ann, typing.TypeAliasType):
+        return _runtime_classes(ann.__value__)
+    if isinstance(ann, type):
+        if issubclass(ann, _Unknown):
+            raise TypeError(f"can't dispatch on the unresolved name "
+                            f"{ann.__name__!r}")
+        return (ann,)
+    raise TypeError(f"can't dispatch on {ann!r}")
+
+def _first_param_annotation(func: Callable[..., Any]) -> Any:
+    params = iter(inspect.signature(func).parameters.values())
+    p = next(params)
+    if p.annotation is inspect.Parameter.empty:
+        raise TypeError(f'{func.__qualname__}: the first parameter of each '
+                        'overload must be annotated')
+    return _eval_annotation(p.annotation, func)
+
+if TYPE_CHECKING:
+    def mode_dispatch[F: Callable[..., Any]](func: F) -> F: ...
+else:
+    def mode_dispatch(func):
+        overloads = get_overloads(func)
+        if not overloads:
+            raise TypeError(f'{func.__qualname__} has no overloads')
+        entries = None
+        table = {}
+        first = next(iter(inspect.signature(func).parameters))
+
+        def dispatch(cls):
+            nonlocal entries
+            impl = table.get(cls)
+            if impl is None:
+                if entries is None:
+                    entries = [
+                        (_runtime_classes(_first_param_annotation(f)), f)
+                        for f in overloads
+                    ]
+                as_cls = _VIEWS.get(cls, cls)
+                for classes, f in entries:
+                    if issubclass(as_cls, classes):
+                        impl = f
+                        break
+                else:
+                    impl = func
+                table[cls] = impl
+            return impl
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # NOTE: the first argument keeps its kind (it may be passed by
+            #   name)
+            if args:
+                arg = args[0]
+            elif first in kwargs:
+                arg = kwargs[first]
+            else:
+                return func(*args, **kwargs)    # raises the usual TypeError
+            impl = table.get(arg.__class__)
+            if impl is None:
+                if isinstance(arg, proxy_base):
+                    impl = dispatch(type(proxy_base._unwrap(arg)))
+                else:
+                    impl = dispatch(arg.__class__)
+            return impl(*args, **kwargs)
+
+        wrapper.dispatch = dispatch
+        return wrapper
+
+if __name__ == "__main__":
+    from typing import overload
+    from mutability import *
+    from mutability_example import A_
+    from mutability_sorted import sortedlist_, sortedlist_r
+    from mutability_ilist import ilist_
+    from mutability_list import list_
+    from mutability_dict import dict_
+    from mutability_set import set_
+
+    class _L: ...
+
+    @overload
+    def f(x: list[int] | tuple[int, ...]) -> str:
+        return 'seq'
+    @overload
+    def f(x: A_[W, _L]) -> str:
+        return 'A_'
+    @overload
+    def f(x: sortedlist_r[int]) -> str:
+        return 'sorted'
+    @overload
+    def f(x: 'dict[str, Undefined]') -> str:       # type: ignore
+        return 'dict'
+    @mode_dispatch
+    def f(x: Any) -> str:
+        raise TypeError(type(x))
+
+    assert f([1]) == f((1,)) == 'seq'
+    assert f(w(A_[WK, None](1))) == 'A_'
+    assert f(sortedlist_[int, WK, None]()) == 'sorted'
+    assert f({}) == 'dict'
+    from mutability_views import r_merge, r_slice
+    ds = lift({'a': 1})
+    assert f(r_merge(ds, r(ds))) == 'dict'         # pyright: ignore
+    assert f(r_slice(lift([1]))) == 'seq'          # pyright: ignore
+    assert f(x=[1]) == 'seq'                           # by name
+    def make_g() -> Any:
+        class _L3: ...
+        @overload
+        def g(x: list_[int, W, _L3] | dict_[str, int, W, _L3]) -> str:
+            return 'list or dict'
+        @overload
+        def g(x: set_[int, W, _L3]) -> str:
+            return 'set'
+        @mode_dispatch
+        def g(x: Any) -> str:
+            raise TypeError(type(x))
+        return g
+    g = make_g()        # `_L3` can't be resolved anymore
+    assert g([1]) == g({'a': 1}) == 'list or dict' and g({1}) == 'set'
+
+    from mutability_guard import guard
+    assert f(guard([1])) == 'seq' and f(guard({})) == 'dict'
+    assert f(guard(w(A_[WK, None](1)))) == 'A_'
+    ils = ilist_[int, WK, None]()
+    assert f(ils) == 'seq'      # type: ignore      a list only at runtime
+    assert f.dispatch(ilist_) is f.dispatch(list)     # pyright: ignore
+    try:
+        f(1)            # type: ignore      no overload
+    except TypeError:
+        pass
+    else:
+        assert False
+    try:
+        f()             # type: ignore      missing argument
+    except TypeError:
+        pass
+    else:
+        assert False
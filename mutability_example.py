@@ -9,7 +9,11 @@ type A_out[M: (R, W, RK, WK)] = A_[M, None]
 type A_r = A_[R, Any]
 
 # Single-lock version (see "mutability_example2.py" for the multi-lock version)
+# NOTE: `@lifted` makes `A_[WK, None](8)` as fast as `A_(8)` at runtime.
+@lifted
 class A_(Generic[Mut_M, Mut_L]):
+    __slots__ = ('_val',)
+
     class _L: ...       # lock
 
     _val: int
@@ -134,3 +138,5 @@ if __name__ == "__main__":
     a_w3 *= 3
     a_w_l1 = w(a_w)
     a_w_l1 *= 3
+
+    assert type(a) is A_ and not hasattr(a, '__orig_class__')
@@ -0,0 +1,48 @@
+# Generated by "mutability_record.py":
+#   python mutability_record.py Point_ x:int y:int
+from __future__ import annotations
+from typing import Generic, Any
+
+from mutability import *
+
+type Point_out[M: (R, W, RK, WK)] = Point_[M, None]
+type Point_r = Point_[R, Any]
+
+@lifted
+class Point_(Generic[Mut_M, Mut_L]):
+    __slots__ = ('_x', '_y')
+
+    _x: int
+    _y: int
+
+    def __init__(self, x: int, y: int) -> None:
+        self._x = x
+        self._y = y
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    class _L1: ...
+    @x.setter
+    def x(self: Point_[W, _L1], x: int) -> None:
+        self._x = x
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    class _L2: ...
+    @y.setter
+    def y(self: Point_[W, _L2], y: int) -> None:
+        self._y = y
+
+    def copy(self) -> Point_out[WK]:
+        return Point_(self._x, self._y)
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, Point_)
+                and (self._x, self._y) == (other._x, other._y))
+
+    def __repr__(self) -> str:
+        return f'Point_(x={self._x!r}, y={self._y!r})'
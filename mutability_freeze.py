@@ -0,0 +1,187 @@
+from __future__ import annotations
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, overload
+
+from mutability import *
+
+__all__ = ['frozenlist', 'frozendict', 'freeze_rk']
+
+# NOTE:
+# * `list_`, `dict_` and `set_` aren't hashable, so RK values can't be used as
+#   dict keys or cache keys. `freeze_rk` converts them into hashable frozen
+#   equivalents: `frozenlist`, `frozendict` and `frozenset`.
+# * The hash is computed on first use and cached (`frozenset` already does
+#   that), so lookups don't re-hash the contents.
+# * Values that are already frozen (including `tuple`s) are NOT copied.
+# * The conversion is shallow: the elements must be hashable.
+
+class frozenlist[T](Sequence[T]):
+    __slots__ = ('_items', '_hash', '__weakref__')
+
+    _items: tuple[T, ...]
+    _hash: int | None
+
+    def __init__(self, iterable: Iterable[T] = (), /) -> None:
+        self._items = tuple(iterable)
+        self._hash = None
+
+    @classmethod
+    def _wrap(cls, items: tuple[T, ...]) -> frozenlist[T]:
+        self = cls.__new__(cls)
+        self._items = items
+        self._hash = None
+        return self
+
+    @overload
+    def __getitem__(self, i: int, /) -> T: ...
+    @overload
+    def __getitem__(self, s: slice, /) -> frozenlist[T]: ...
+    def __getitem__(self, s, /) -> Any:
+        if isinstance(s, slice):
+            return frozenlist._wrap(self._items[s])
+        return self._items[s]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._items.__sizeof__()
+
+    def as_tuple(self) -> tuple[T, ...]:
+        """Returns the items (no copy: they're immutable)."""
+        return self._items
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def __contains__(self, value: object, /) -> bool:
+        return value in self._items
+
+    def __hash__(self) -> int:
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(self._items)
+        return h
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, frozenlist):
+            return NotImplemented
+        if self._hash is not None and other._hash is not None \
+                and self._hash != other._hash:
+            return False
+        return self._items == other._items
+
+    def __repr__(self) -> str:
+        return f'frozenlist({list(self._items)!r})'
+
+class frozendict[K, V](Mapping[K, V]):
+    __slots__ = ('_map', '_hash', '__weakref__')
+
+    _map: dict[K, V]
+    _hash: int | None
+
+    def __init__(self, *args: Any, **kwargs: V) -> None:
+        self._map = dict[K, V](*args, **kwargs)
+        self._hash = None
+
+    @classmethod
+    def _wrap(cls, map: dict[K, V]) -> frozendict[K, V]:
+        self = cls.__new__(cls)
+        self._map = map
+        self._hash = None
+        return self
+
+    def __getitem__(self, key: K, /) -> V:
+        return self._map[key]
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._map.__sizeof__()
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._map)
+
+    def __contains__(self, key: object, /) -> bool:
+        return key in self._map
+
+    def __hash__(self) -> int:
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(frozenset(self._map.items()))
+        return h
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, frozendict):
+            return NotImplemented
+        if self._hash is not None and other._hash is not None \
+                and self._hash != other._hash:
+            return False
+        return self._map == other._map
+
+    def __repr__(self) -> str:
+        return f'frozendict({self._map!r})'
+
+if TYPE_CHECKING:
+    from mutability_list import list_
+    from mutability_dict import dict_
+    from mutability_set import set_
+
+    @overload
+    def freeze_rk[K, V](obj: dict_[K, V, RK, Any]) -> frozendict[K, V]: ...
+    @overload
+    def freeze_rk[T](obj: set_[T, RK, Any]) -> frozenset[T]: ...
+    @overload
+    def freeze_rk[T](obj: list_[T, RK, Any]) -> frozenlist[T]: ...
+    @overload
+    def freeze_rk[K, V](obj: frozendict[K, V]) -> frozendict[K, V]: ...
+    @overload
+    def freeze_rk[T](obj: frozenset[T]) -> frozenset[T]: ...
+    @overload
+    def freeze_rk[T](obj: frozenlist[T] | tuple[T, ...]) -> frozenlist[T]: ...
+    def freeze_rk(obj: Any) -> Any: ...
+else:
+    def freeze_rk(obj):
+        cls = type(obj)
+        if cls is frozenlist or cls is frozendict or cls is frozenset:
+            return obj
+        if cls is tuple:
+            return frozenlist._wrap(obj)
+        if isinstance(obj, dict):
+            return frozendict._wrap(dict(obj))
+        if isinstance(obj, (set, frozenset)):
+            return frozenset(obj)
+        if isinstance(obj, (list, tuple)):
+            return frozenlist._wrap(tuple(obj))
+        raise TypeError(f"can't freeze {cls.__name__!r}")
+
+if __name__ == "__main__":
+    from typing import assert_type
+
+    xs = lift_and_rk([1, 2, 3])
+    ds = lift_and_rk({'a': 1})
+    ss = lift_and_rk({4, 5})
+
+    fxs = freeze_rk(xs)
+    fds = freeze_rk(ds)
+    fss = freeze_rk(ss)
+    assert_type(fxs, frozenlist[int])
+    assert_type(fds, frozendict[str, int])
+    assert_type(fss, frozenset[int])
+
+    _ = freeze_rk(r(xs))        # pyright: ignore
+
+    cache = {fxs: 'xs', fds: 'ds', fss: 'ss'}
+    assert cache[freeze_rk(lift_and_rk([1, 2, 3]))] == 'xs'
+    assert cache[freeze_rk(lift_and_rk({'a': 1}))] == 'ds'
+    assert cache[frozenset({4, 5})] == 'ss'
+
+    assert freeze_rk(fxs) is fxs and freeze_rk(fss) is fss
+    t = (1, 2)
+    assert freeze_rk(t).as_tuple() is t
+    assert fxs[1:] == frozenlist([2, 3]) and list(fds.items()) == [('a', 1)]
@@ -0,0 +1,416 @@
+from __future__ import annotations
+import copy
+import re
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+__all__ = [
+    'ModeViolation', 'configure', 'guard', 'stats', 'r', 'rk', 'proxy_base',
+    'dict_proxy_base',
+]
+
+# NOTE:
+# * Static checking only covers type-checked code. Untyped code (e.g.
+#   plugins) can still modify what we handed out as `r(...)`.
+# * This module provides drop-in versions of `r` and `rk` that, once every
+#   `rate` calls, return a *guarded proxy* whose W methods raise
+#   `ModeViolation` (or call `on_violation`, if given, and proceed). Import
+#   them instead of the ones in "mutability.py" where values leave the
+#   type-checked code:
+#       from mutability_guard import r, rk
+# * The cost is bounded by the sampling rate and by `max_live`, the maximum
+#   number of live proxies: once it's reached, `r` and `rk` return their
+#   argument until some proxy is collected.
+# * The W methods of `list`, `dict` and `set` are known. For lifted classes,
+#   a method is W if its `self` is annotated with a `W` or `WK` mode, and
+#   setting an attribute through a proxy is always a violation.
+# * The operators and comparisons that don't mutate (`+`, `|`, `<`, ...) and
+#   `hash` are forwarded. Copying a proxy (`copy.copy`, `copy.deepcopy`,
+#   `pickle`) copies the proxied object, which is then owned by the caller.
+# * A proxy of a dict is a `dict` subclass whose methods are all forwarded,
+#   so that `isinstance(p, dict)`, `json.dumps(p)`, `dict(p)` and `{**p}`
+#   see the proxied dict. Other proxies are NOT instances of the
+#   proxied type (a `list` subclass wouldn't work: C code such as the `json`
+#   encoder reads the items of a list directly).
+
+class ModeViolation(TypeError): ...
+
+_rate = 1000
+_max_live = 100
+_on_violation: Callable[[Any, str], None] | None = None
+_count = 0
+_live = 0
+_guarded = 0
+_violations = 0
+
+def configure(rate: int = 1000, max_live: int = 100,
+              on_violation: Callable[[Any, str], None] | None = None
+              ) -> None:
+    """Guards 1 conversion every `rate` (0 disables the guards)."""
+    global _rate, _max_live, _on_violation, _count
+    _rate = rate
+    _max_live = max_live
+    _on_violation = on_violation
+    _count = 0
+
+def stats() -> dict[str, int]:
+    return {'guarded': _guarded, 'live': _live, 'violations': _violations}
+
+def _violation(obj: Any, name: str) -> None:
+    global _violations
+    _violations += 1
+    if _on_violation is None:
+        raise ModeViolation(
+            f'{name!r} called on a read-only {type(obj).__name__!r}')
+    _on_violation(obj, name)
+
+_LIST_W = frozenset({
+    'append', 'extend', 'pop', 'insert', 'remove', 'sort', 'reverse', 'clear',
+})
+_DICT_W = frozenset({
+    'pop', 'popitem', 'setdefault', 'update', 'clear',
+})
+_SET_W = frozenset({
+    'add', 'discard', 'remove', 'pop', 'clear', 'update', 'difference_update',
+    'intersection_update', 'symmetric_difference_update',
+})
+
+_W_ANN = re.compile(r'\bW\b|\bWK\b|_Self_W')
+_w_methods: dict[type, frozenset[str]] = {
+    list: _LIST_W, dict: _DICT_W, set: _SET_W,
+}
+
+def _get_w_methods(cls: type) -> frozenset[str]:
+    names = _w_methods.get(cls)
+    if names is None:
+        found: set[str] = set()
+        for c in cls.__mro__:
+            base = _w_methods.get(c)
+            if base is not None:
+                found |= base
+                continue
+            for name, f in vars(c).items():
+                ann = getattr(f, '__annotations__', None)
+                if ann and _W_ANN.search(str(ann.get('self', ''))):
+                    found.add(name)
+        names = _w_methods[cls] = frozenset(found)
+    return names
+
+class proxy_base:
+    """The methods of the guarded proxies. A subclass must have an `_obj`
+    slot and may override `_wrap` (see "mutability_deep.py")."""
+    __slots__ = ()
+
+    _obj: Any
+
+    def __init__(self, obj: Any) -> None:
+        object.__setattr__(self, '_obj', obj)
+
+    def _wrap(self, x: Any) -> Any:
+        """Applied to the elements read through the proxy."""
+        return x
+
+    @staticmethod
+    def _unwrap(x: Any) -> Any:
+        return x._obj if isinstance(x, proxy_base) else x
+
+    def __getattr__(self, name: str) -> Any:
+        obj = self._obj
+        if name in _get_w_methods(type(obj)):
+            _violation(obj, name)
+        return getattr(obj, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        _violation(self._obj, f'__setattr__({name!r})')
+        setattr(self._obj, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        _violation(self._obj, f'__delattr__({name!r})')
+        delattr(self._obj, name)
+
+    def __len__(self) -> int:
+        return len(self._obj)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self._wrap, self._obj)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return map(self._wrap, reversed(self._obj))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._obj
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._wrap(self._obj[key])
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        _violation(self._obj, '__setitem__')
+        self._obj[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        _violation(self._obj, '__delitem__')
+        del self._obj[key]
+
+    def _inplace(self, name: str, value: Any) -> Any:
+        _violation(self._obj, name)
+        res = getattr(self._obj, name)(value)
+        return self if res is self._obj else res
+
+    def __iadd__(self, value: Any) -> Any:
+        return self._inplace('__iadd__', value)
+
+    def __imul__(self, value: Any) -> Any:
+        return self._inplace('__imul__', value)
+
+    def __ior__(self, value: Any) -> Any:
+        return self._inplace('__ior__', value)
+
+    def __iand__(self, value: Any) -> Any:
+        return self._inplace('__iand__', value)
+
+    def __isub__(self, value: Any) -> Any:
+        return self._inplace('__isub__', value)
+
+    def __ixor__(self, value: Any) -> Any:
+        return self._inplace('__ixor__', value)
+
+    # the results of the operators are new objects, owned by the caller
+
+    def __add__(self, value: Any) -> Any:
+        return self._obj + self._unwrap(value)
+
+    def __radd__(self, value: Any) -> Any:
+        return self._unwrap(value) + self._obj
+
+    def __mul__(self, value: Any) -> Any:
+        return self._obj * value
+
+    def __rmul__(self, value: Any) -> Any:
+        return value * self._obj
+
+    def __or__(self, value: Any) -> Any:
+        return self._obj | self._unwrap(value)
+
+    def __ror__(self, value: Any) -> Any:
+        return self._unwrap(value) | self._obj
+
+    def __and__(self, value: Any) -> Any:
+        return self._obj & self._unwrap(value)
+
+    def __rand__(self, value: Any) -> Any:
+        return self._unwrap(value) & self._obj
+
+    def __sub__(self, value: Any) -> Any:
+        return self._obj - self._unwrap(value)
+
+    def __rsub__(self, value: Any) -> Any:
+        return self._unwrap(value) - self._obj
+
+    def __xor__(self, value: Any) -> Any:
+        return self._obj ^ self._unwrap(value)
+
+    def __rxor__(self, value: Any) -> Any:
+        return self._unwrap(value) ^ self._obj
+
+    def __eq__(self, value: object) -> bool:
+        return self._obj == self._unwrap(value)
+
+    def __ne__(self, value: object) -> bool:
+        return self._obj != self._unwrap(value)
+
+    def __lt__(self, value: Any) -> bool:
+        return self._obj < self._unwrap(value)
+
+    def __le__(self, value: Any) -> bool:
+        return self._obj <= self._unwrap(value)
+
+    def __gt__(self, value: Any) -> bool:
+        return self._obj > self._unwrap(value)
+
+    def __ge__(self, value: Any) -> bool:
+        return self._obj >= self._unwrap(value)
+
+    def __hash__(self) -> int:
+        return hash(self._obj)
+
+    def __bool__(self) -> bool:
+        return bool(self._obj)
+
+    def __copy__(self) -> Any:
+        return copy.copy(self._obj)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Any:
+        return copy.deepcopy(self._obj, memo)
+
+    def __reduce__(self) -> Any:
+        return _unpickle, (self._obj,)
+
+    def __repr__(self) -> str:
+        return f'guard({self._obj!r})'
+
+def _unpickle(obj: Any) -> Any:
+    return obj
+
+class _counted(proxy_base):
+    """Counted by `stats` and limited by `max_live`."""
+    __slots__ = ()
+
+    def __init__(self, obj: Any) -> None:
+        global _live, _guarded
+        super().__init__(obj)
+        _live += 1
+        _guarded += 1
+
+    def __del__(self) -> None:
+        global _live
+        _live -= 1
+
+class _proxy(_counted):
+    __slots__ = ('_obj', '__weakref__')
+
+class dict_proxy_base(proxy_base, dict[Any, Any]):
+    """The `proxy_base` of the proxies of dicts: a `dict` subclass whose
+    public methods go through `__getattr__`."""
+    __slots__ = ()
+
+    def __init__(self, obj: Any) -> None:
+        super().__init__(obj)
+        # NOTE: some C code (e.g. the `json` encoder) checks the size of the
+        #   dict itself before calling the forwarded methods
+        dict.__setitem__(self, dict_proxy_base, None)
+
+def _forward(name: str) -> property:
+    return property(lambda self: self.__getattr__(name))
+
+def _forward_dict_methods() -> None:
+    # NOTE: the methods of `dict` would read the proxy itself
+    for name in vars(dict):
+        if not name.startswith('_') and name != 'fromkeys':
+            setattr(dict_proxy_base, name, _forward(name))
+
+_forward_dict_methods()
+
+class _dict_proxy(_counted, dict_proxy_base):
+    __slots__ = ('_obj', '__weakref__')
+
+def _guard(obj: Any) -> Any:
+    if isinstance(obj, proxy_base) or obj is None \
+            or isinstance(obj, (int, float, str, bytes, tuple, frozenset)):
+        return obj
+    if isinstance(obj, dict):
+        return _dict_proxy(obj)
+    return _proxy(obj)
+
+if TYPE_CHECKING:
+    from mutability import r, rk
+    def guard[T](obj: T) -> T: ...
+else:
+    def guard(obj):
+        """Always returns a guarded proxy (if `obj` is mutable)."""
+        return _guard(obj)
+
+    def r(obj):
+        global _count
+        if _rate:
+            _count += 1
+            if _count >= _rate:
+                _count = 0
+                if _live < _max_live:
+                    return _guard(obj)
+        return obj
+
+    rk = r
+
+if __name__ == "__main__":
+    import gc
+    from mutability_example import A_
+    from mutability import lift, WK
+
+    configure(rate=3)
+    xs = lift([1, 2, 3])
+    got = [r(xs) for _ in range(6)]
+    assert [type(x) is _proxy for x in got] == [False, False, True] * 2
+    assert stats()['live'] == 2
+    ys = got[2]
+    assert ys == xs and ys[0] == 1 and len(ys) == 3 and list(ys) == xs
+    for bad in (lambda: ys.append(4),           # pyright: ignore
+                lambda: ys.__setitem__(0, 0),   # pyright: ignore
+                lambda: ys.sort()):             # pyright: ignore
+        try:
+            bad()
+        except ModeViolation:
+            pass
+        else:
+            assert False
+    try:
+        ys += [5]       # pyright: ignore
+    except ModeViolation:
+        pass
+    else:
+        assert False
+    assert xs == [1, 2, 3] and stats()['violations'] == 4
+
+    a = guard(A_[WK, None](8))
+    assert a.val == 8 and a.get_val() == 8
+    try:
+        a.set_val(3)    # pyright: ignore
+    except ModeViolation:
+        pass
+    else:
+        assert False
+    try:
+        a.val = 3       # pyright: ignore
+    except ModeViolation:
+        pass
+    else:
+        assert False
+
+    # the operators that don't mutate are forwarded
+    ps, ss = guard([1, 2]), guard({1, 2})
+    assert ps + [3] == [1, 2, 3] and [0] + ps == [0, 1, 2]
+    assert ps * 2 == 2 * ps == [1, 2, 1, 2] and ps + ps == [1, 2, 1, 2]
+    assert ps < [1, 3] and ps <= ps and ps > [1] and ps >= [1, 2]
+    assert ps != [1] and not (ps != [1, 2])
+    assert ss | {3} == {3} | ss == {1, 2, 3}
+    assert ss & {2} == {2} & ss == {2}
+    assert ss - {1} == {2} and {1} - ss == set()
+    assert ss ^ {1} == {1} ^ ss == {2} and ss <= {1, 2, 3}
+    g = guard(A_[WK, None](1))
+    assert {g: 1}[g] == 1 and hash(g) == hash(g._obj)   # pyright: ignore[reportAttributeAccessIssue]
+    try:
+        hash(ps)
+    except TypeError:
+        pass
+    else:
+        assert False
+    c = copy.copy(ps)
+    assert type(c) is list and c == [1, 2]
+    c.append(3)
+    assert ps == [1, 2] and copy.deepcopy(ss) == {1, 2}
+
+    import json
+    import pickle
+    ds = guard({'a': [1], 'b': 2})
+    assert isinstance(ds, dict) and json.dumps(ds) == '{"a": [1], "b": 2}'
+    assert dict(ds) == {**ds} == ds and ds | {'c': 3} == {**ds, 'c': 3}
+    assert list(ds.items()) == [('a', [1]), ('b', 2)] and ds.get('b') == 2
+    assert pickle.loads(pickle.dumps(ds)) == ds
+    assert type(pickle.loads(pickle.dumps(ps))) is list
+    for bad in (lambda: ds.update(c=3), lambda: ds.setdefault('c', 3),
+                lambda: ds.clear()):
+        try:
+            bad()
+        except ModeViolation:
+            pass
+        else:
+            assert False
+    assert ds == {'a': [1], 'b': 2}
+    del ps, ss, ds, g
+
+    seen: list[str] = []
+    configure(rate=1, max_live=1, on_violation=lambda o, n: seen.append(n))
+    del got, ys, a
+    gc.collect()
+    d = r(lift({'a': 1}))
+    assert r(lift({'b': 2})).__class__ is dict      # max_live reached
+    d['a'] = 2          # type: ignore      read-only (reported, then done)
+    assert seen == ['__setitem__'] and d == {'a': 2}
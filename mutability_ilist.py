@@ -0,0 +1,319 @@
+from __future__ import annotations
+import sys
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import TYPE_CHECKING, Any
+
+from mutability import *
+from mutability_list import *
+
+__all__ = ['ilist_', 'ilist_out', 'ilist_r']
+
+# NOTE:
+# * `ilist_` is a `list_` whose `count` and `__contains__` are O(1) and whose
+#   `index` is O(log k), where k is the number of occurrences of the value.
+#   The elements must be hashable.
+# * All the mutations go through the W methods, which keep a value -> count
+#   map exact and a value -> positions map valid when that's cheap (`append`,
+#   `extend`, `pop()`, `__setitem__` with an index, ...). The operations that
+#   shift positions (`insert`, `remove`, `sort`, ...) just drop the positions
+#   map.
+# * Rebuilding the positions map is O(n), so, after a shift, `index` scans the
+#   list like `list.index` and rebuilds the map only after `_REBUILD_AFTER`
+#   calls without shifts in between. Hence, with many shifts, `index` is as
+#   fast as `list.index` (but not faster), while `count`, `in` and the
+#   `index` of absent values stay O(1).
+# * Run "python mutability_ilist.py --bench" for the benchmarks.
+
+_REBUILD_AFTER = 16
+
+if TYPE_CHECKING:
+    from typing import TypeVar
+
+    _T = TypeVar('_T')
+
+    # NOTE: These don't depend on a lock => they can be used anywhere
+    type ilist_out[T, M: (R, W, RK, WK)] = ilist_[T, M, None]
+    type ilist_r[T] = ilist_[T, R, Any]
+
+    # NOTE: the W methods are inherited (with the lock of `list_`)
+    class ilist_(list_[_T, Mut_M, Mut_L]):
+        def copy(self) -> ilist_out[_T, WK]: ...
+else:
+    @lifted
+    class ilist_(list):
+        __slots__ = ('_counts', '_pos', '_scans')
+
+        def __init__(self, iterable=(), /):
+            list.__init__(self, iterable)
+            self._counts = Counter(self)
+            self._pos = None
+            self._scans = 0
+
+        def _positions(self):
+            pos = self._pos
+            if pos is None:
+                pos = {}
+                for i, x in enumerate(self):
+                    p = pos.get(x)
+                    if p is None:
+                        pos[x] = [i]
+                    else:
+                        p.append(i)
+                self._pos = pos
+            return pos
+
+        def _shifted(self):
+            self._pos = None
+            self._scans = 0
+
+        def _dec(self, x):
+            counts = self._counts
+            n = counts[x] - 1
+            if n:
+                counts[x] = n
+            else:
+                del counts[x]
+
+        # R methods
+
+        def copy(self):
+            res = ilist_.__new__(ilist_)
+            list.__init__(res, self)
+            res._counts = self._counts.copy()
+            res._pos = None
+            res._scans = 0
+            return res
+
+        # NOTE: the slots aren't part of the list state seen by `copy` and
+        #   `pickle`, so we rebuild them from the elements
+        def __copy__(self):
+            return self.copy()
+
+        def __reduce__(self):
+            return (ilist_, (list(self),))
+
+        def count(self, value, /):
+            return self._counts.get(value, 0)
+
+        def __contains__(self, key, /):
+            return key in self._counts
+
+        def index(self, value, start=0, stop=sys.maxsize, /):
+            if value in self._counts:
+                if self._pos is None and self._scans < _REBUILD_AFTER:
+                    self._scans += 1
+                    return list.index(self, value, start, stop)
+                start, stop, _ = slice(start, stop).indices(len(self))
+                p = self._positions()[value]
+                i = bisect_left(p, start)
+                if i < len(p) and p[i] < stop:
+                    return p[i]
+            raise ValueError(f'{value!r} is not in list')
+
+        # W methods
+
+        def append(self, object, /):
+            list.append(self, object)
+            self._counts[object] += 1
+            if self._pos is not None:
+                self._pos.setdefault(object, []).append(len(self) - 1)
+
+        def extend(self, iterable, /):
+            n = len(self)
+            list.extend(self, iterable)
+            new = list.__getitem__(self, slice(n, None))
+            self._counts.update(new)
+            pos = self._pos
+            if pos is not None:
+                for i, x in enumerate(new, n):
+                    pos.setdefault(x, []).append(i)
+
+        def __iadd__(self, value, /):
+            self.extend(value)
+            return self
+
+        def insert(self, index, object, /):
+            if index >= len(self):
+                self.append(object)
+                return
+            list.insert(self, index, object)
+            self._counts[object] += 1
+            self._shifted()
+
+        def pop(self, index=-1, /):
+            x = list.pop(self, index)
+            self._dec(x)
+            pos = self._pos
+            if pos is not None:
+                if index == -1 or index == len(self):
+                    p = pos[x]
+                    p.pop()
+                    if not p:
+                        del pos[x]
+                else:
+                    self._shifted()
+            return x
+
+        def remove(self, value, /):
+            list.remove(self, value)
+            self._dec(value)
+            self._shifted()
+
+        def clear(self):
+            list.clear(self)
+            self._counts.clear()
+            self._shifted()
+
+        def sort(self, *, key=None, reverse=False):
+            list.sort(self, key=key, reverse=reverse)
+            self._shifted()
+
+        def reverse(self):
+            list.reverse(self)
+            self._shifted()
+
+        def __setitem__(self, key, value, /):
+            if isinstance(key, slice):
+                values = list(value)
+                old = list.__getitem__(self, key)
+                list.__setitem__(self, key, values)
+                for x in old:
+                    self._dec(x)
+                self._counts.update(values)
+                self._shifted()
+                return
+            i = range(len(self))[key]
+            old = list.__getitem__(self, i)
+            list.__setitem__(self, i, value)
+            self._dec(old)
+            self._counts[value] += 1
+            pos = self._pos
+            if pos is not None:
+                p = pos[old]
+                del p[bisect_left(p, i)]
+                if not p:
+                    del pos[old]
+                insort(pos.setdefault(value, []), i)
+
+        def __delitem__(self, key, /):
+            if isinstance(key, slice):
+                for x in list.__getitem__(self, key):
+                    self._dec(x)
+                list.__delitem__(self, key)
+                self._shifted()
+            else:
+                self.pop(range(len(self))[key])
+
+        def __imul__(self, value, /):
+            list.__imul__(self, value)
+            self._counts = Counter(self)
+            self._shifted()
+            return self
+
+    ilist_out = ilist_r = ilist_
+
+def _bench(sizes: tuple[int, ...] = (1_000, 10_000, 100_000),
+           read_fracs: tuple[float, ...] = (0.99, 0.9, 0.5),
+           n_ops: int = 2_000) -> None:
+    import random
+    from time import perf_counter
+
+    # NOTE: the writes either keep the positions (`set`: `xs[i] = v`) or
+    #   shift them (`shift`: `insert(i, v)` and `pop(i)`, alternately).
+    def run(xs: Any, ops: list[tuple[int, int, int]]) -> float:
+        t = perf_counter()
+        for kind, i, v in ops:
+            if kind == 0:
+                _ = v in xs
+            elif kind == 1:
+                if v in xs:
+                    xs.index(v)
+            elif kind == 2:
+                xs[i] = v
+            elif kind == 3:
+                xs.insert(i, v)
+            else:
+                xs.pop(i)
+        return perf_counter() - t
+
+    print(f'{"size":>8} {"reads":>6} {"writes":>7} {"list (ms)":>10} '
+          f'{"ilist_ (ms)":>12} {"speedup":>8}')
+    for size in sizes:
+        for writes in ('set', 'shift'):
+            for rf in read_fracs:
+                rnd = random.Random(size)
+                ops: list[tuple[int, int, int]] = []
+                shifts = 0
+                for _ in range(n_ops):
+                    v = rnd.randrange(2 * size)
+                    if rnd.random() < rf:
+                        ops.append((rnd.randrange(2), 0, v))
+                    elif writes == 'set':
+                        ops.append((2, rnd.randrange(size), v))
+                    else:
+                        ops.append((3 + shifts % 2, rnd.randrange(size), v))
+                        shifts += 1
+                data = list(range(size))
+                t_list = run(list(data), ops)
+                t_ilist = run(ilist_(data), ops)
+                print(f'{size:>8} {rf:>6.0%} {writes:>7} '
+                      f'{t_list * 1e3:>10.2f} {t_ilist * 1e3:>12.2f} '
+                      f'{t_list / t_ilist:>7.1f}x')
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--bench']:
+        _bench()
+    else:
+        from typing import assert_type
+
+        xs = ilist_[int, WK, None]([3, 1, 3, 2])
+        assert type(xs) is ilist_
+        assert_type(xs.copy(), ilist_[int, WK, None])
+        assert 3 in xs and xs.count(3) == 2 and xs.index(3) == 0
+        assert xs.index(3, 1) == 2 and 7 not in xs
+
+        xs_w = w(xs)
+        xs_w.append(7)
+        xs_w[0] = 1
+        assert xs.index(3) == 2 and xs.count(1) == 2 and xs.index(7) == 4
+        xs_w.insert(0, 9)
+        assert xs.index(3) == 3
+        xs_w.remove(9)
+        xs_w.pop()
+        xs_w.extend([5, 5])
+        del xs_w[0]
+        xs_w[1:3] = [8]
+        xs_w.sort()
+        assert xs == [1, 5, 5, 8]
+        assert {x: xs.count(x) for x in xs} == {1: 1, 5: 2, 8: 1}
+        assert xs.index(5) == 1 and 3 not in xs and xs.count(2) == 0
+        xs_w2 = w(xs)
+        xs_w2 *= 2
+        assert xs.count(5) == 4 and xs.index(8, 4) == 7
+        xs_w2 = w(xs)
+        xs_w2 += [2]
+        assert xs.count(2) == 1 and xs.index(2) == 8
+
+        # after a shift, `index` scans until it's worth rebuilding the map
+        for _ in range(_REBUILD_AFTER + 1):
+            w(xs).insert(0, 0)
+            assert xs.index(2) == xs.index(1) + 8
+        assert xs.index(0) == 0 and xs.count(0) == _REBUILD_AFTER + 1
+
+        ys = xs.copy()
+        del w(ys)[:]
+        assert not ys and 5 in xs
+
+        import copy, pickle
+        for zs in (copy.copy(xs), copy.deepcopy(xs),
+                   pickle.loads(pickle.dumps(xs))):
+            assert type(zs) is ilist_ and zs == xs and zs is not xs
+            assert zs.count(5) == xs.count(5) and zs.index(2) == xs.index(2)
+            w(zs).append(5)
+            assert zs.count(5) == xs.count(5) + 1
+
+        wrong = False
+        if wrong:
+            xs.append(1)        # type: ignore      needs explicit permission
+            r(xs).append(1)     # type: ignore      read-only
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import subprocess
+import sys
+
+# NOTE:
+# * Regression benchmark for the startup cost of the runtime package: it runs
+#   "python -X importtime -c 'import ...'" in fresh processes and reports the
+#   modules loaded because of `MODULES` (those loaded by a bare interpreter
+#   are excluded), with their cumulative import times.
+# * It fails if a forbidden module (e.g. `typing`) gets loaded or if the
+#   median total exceeds the budget:
+#       python mutability_importtime.py [--budget-us N] [--runs N]
+# * The first check is the reliable one: the times depend on the machine and
+#   on the file system (finding even an empty module may take ~1ms), so the
+#   default budget is loose.
+
+MODULES = ('mutability', 'mutability_list', 'mutability_dict',
+           'mutability_set')
+FORBIDDEN = ('typing', 'mutability_tvars', 'mutability_reg', 're',
+             'collections', 'functools')
+BUDGET_US = 8000
+
+def _importtime(code: str) -> dict[str, tuple[int, bool]]:
+    """Maps each imported module to its cumulative import time (us) and to
+    whether it was imported directly by `code`."""
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+    times: dict[str, tuple[int, bool]] = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(cumulative), not name.startswith('  '))
+    return times
+
+def measure(modules: tuple[str, ...] = MODULES) -> tuple[int, list[str]]:
+    """Returns the total import time (us) and the modules loaded."""
+    base = _importtime('pass')
+    times = _importtime('import ' + ', '.join(modules))
+    loaded = [m for m in times if m not in base]
+    return sum(t for m in loaded for t, top in [times[m]] if top), loaded
+
+def main(argv: list[str]) -> int:
+    budget, runs = BUDGET_US, 9
+    args = iter(argv)
+    for a in args:
+        if a == '--budget-us':
+            budget = int(next(args))
+        elif a == '--runs':
+            runs = int(next(args))
+        else:
+            print(f'unknown argument: {a}')
+            return 2
+
+    totals: list[int] = []
+    loaded: list[str] = []
+    for _ in range(runs):
+        total, loaded = measure()
+        totals.append(total)
+    totals.sort()
+    median = totals[len(totals) // 2]
+
+    print(f'modules loaded: {", ".join(loaded)}')
+    print(f'import time (us): median {median}, min {totals[0]}, '
+          f'max {totals[-1]}, budget {budget}')
+    ok = True
+    bad = [m for m in FORBIDDEN if m in loaded]
+    if bad:
+        print(f'FAIL: forbidden modules loaded: {", ".join(bad)}')
+        ok = False
+    if median > budget:
+        print('FAIL: over budget')
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,149 @@
+from __future__ import annotations
+import sys
+import weakref
+from typing import Any, overload
+
+from mutability_freeze import frozenlist, frozendict
+
+__all__ = ['InternPool', 'InternStats']
+
+# NOTE:
+# * RK data is never written, so equal RK values can share a single instance.
+#   The pool works on frozen values (see "mutability_freeze.py"):
+#       xs = pool.intern(freeze_rk(xs))
+# * The pool only holds weak references, so a value is evicted as soon as its
+#   last user drops it.
+# * Values are shared only if they're equal AND their elements have the same
+#   types, at any depth, so `{'flag': 1}` isn't replaced by `{'flag': True}`,
+#   nor `[1]` by `[1.0]` (nor `0.0` by `-0.0`).
+# * The pool is not thread-safe.
+
+class InternStats:
+    __slots__ = ('lookups', 'hits', 'live', 'saved_bytes')
+
+    def __init__(self, lookups: int, hits: int, live: int, saved_bytes: int
+                 ) -> None:
+        self.lookups = lookups
+        self.hits = hits
+        self.live = live
+        self.saved_bytes = saved_bytes
+
+    def __repr__(self) -> str:
+        return (f'InternStats(lookups={self.lookups}, hits={self.hits}, '
+                f'live={self.live}, saved_bytes={self.saved_bytes})')
+
+def _same(a: Any, b: Any) -> bool:
+    """Whether `a == b` also holds for the types of the elements."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, float):
+        return a.hex() == b.hex()               # 0.0 == -0.0
+    if isinstance(a, (frozenlist, tuple)):
+        return all(map(_same, a, b))
+    if isinstance(a, (frozendict, frozenset)):
+        # NOTE: `b` may hold an equal key of another type (e.g. `True` and 1)
+        b_keys: dict[Any, Any] = {k: k for k in b}
+        for k in a:
+            bk = b_keys[k]
+            if not _same(k, bk) or (isinstance(a, frozendict)
+                                    and not _same(a[k], b[bk])):
+                return False
+    return True
+
+class InternPool:
+    """Maps equal frozen values to a single shared instance.
+
+    `saved_bytes` counts the bytes of the duplicates that `intern` replaced
+    with the shared instance.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[int, list[weakref.ref[Any]]] = {}
+        self._lookups = 0
+        self._hits = 0
+        self._live = 0
+        self._saved_bytes = 0
+
+    @overload
+    def intern[T](self, obj: frozenlist[T]) -> frozenlist[T]: ...
+    @overload
+    def intern[K, V](self, obj: frozendict[K, V]) -> frozendict[K, V]: ...
+    @overload
+    def intern[T](self, obj: frozenset[T]) -> frozenset[T]: ...
+    def intern(self, obj: Any) -> Any:
+        if not isinstance(obj, (frozenlist, frozendict, frozenset)):
+            raise TypeError(f"can't intern a {type(obj).__name__!r}")
+        self._lookups += 1
+        h = hash(obj)
+        bucket = self._buckets.get(h)
+        if bucket is None:
+            bucket = self._buckets[h] = []
+        else:
+            for ref in bucket:
+                x = ref()
+                if x is obj:
+                    return obj
+                if x is not None and x == obj and _same(x, obj):
+                    self._hits += 1
+                    self._saved_bytes += sys.getsizeof(obj)
+                    return x
+        bucket.append(weakref.ref(obj, self._make_remover(h)))
+        self._live += 1
+        return obj
+
+    def _make_remover(self, h: int):
+        def remove(ref: weakref.ref[Any]) -> None:
+            bucket = self._buckets.get(h)
+            if bucket is not None:
+                bucket.remove(ref)
+                if not bucket:
+                    del self._buckets[h]
+                self._live -= 1
+        return remove
+
+    def __len__(self) -> int:
+        return self._live
+
+    def stats(self) -> InternStats:
+        return InternStats(self._lookups, self._hits, self._live,
+                           self._saved_bytes)
+
+if __name__ == "__main__":
+    import gc
+    from typing import assert_type
+    from mutability import lift_and_rk
+    from mutability_freeze import freeze_rk
+
+    pool = InternPool()
+    configs = [pool.intern(freeze_rk(lift_and_rk({'tier': 'gold', 'n': 3})))
+               for _ in range(100)]
+    assert_type(configs[0], frozendict[str, str | int])
+    assert all(c is configs[0] for c in configs)
+    vecs = [pool.intern(freeze_rk(lift_and_rk([0.5] * 100)))
+            for _ in range(10)]
+    assert all(v is vecs[0] for v in vecs)
+    sets = [pool.intern(freeze_rk(lift_and_rk({1, 2}))) for _ in range(3)]
+    assert all(s is sets[0] for s in sets)
+
+    st = pool.stats()
+    assert (st.lookups, st.hits, st.live) == (113, 110, 3)
+    assert st.saved_bytes > 0
+
+    # equal, but with elements of other types => not shared
+    c1 = pool.intern(freeze_rk(lift_and_rk({'flag': True, 'n': 1})))
+    c2 = pool.intern(freeze_rk(lift_and_rk({'flag': 1, 'n': 1.0})))
+    assert c1 == c2 and c1 is not c2 and type(c2['flag']) is int
+    v1 = pool.intern(freeze_rk(lift_and_rk([frozenset({1}), 0.0])))
+    v2 = pool.intern(freeze_rk(lift_and_rk([frozenset({True}), -0.0])))
+    assert v1 is not v2
+    for bad in ((1, 2), 'abc'):
+        try:
+            pool.intern(bad)        # type: ignore      not a frozen value
+        except TypeError:
+            pass
+        else:
+            assert False
+
+    del configs, vecs, c1, c2, v1, v2
+    gc.collect()
+    assert len(pool) == 1
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, assert_type, Literal as L, Any
-from mutability import *
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+    from mutability import *
 
 __all__ = ['list_', 'list_out', 'list_r']
 
@@ -91,6 +93,9 @@ else:
     list_ = list_out = list_r = list
 
 if __name__ == "__main__":
+    from typing import assert_type, Literal as L, Any
+    from mutability import *
+
     a = lift([1, 2, 3])
     a_r = r(a)
     a_w = w(a)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+import io
+import pickle
+import struct
+import sys
+from array import array
+from pickle import PickleBuffer
+from typing import Any, Iterable
+
+__all__ = ['dumps', 'loads_rk', 'loads_wk']
+
+# NOTE:
+# * `dumps` pickles with protocol 5 and moves the contiguous payloads
+#   (`array.array`s, contiguous `memoryview`s and, natively, NumPy arrays) out
+#   of band: they're returned as `PickleBuffer`s that can be sent without
+#   copying (e.g. with `socket.sendmsg` or through shared memory).
+# * `bytes` and `bytearray` are pickled by a fast path that can't be
+#   overridden (without a Python call per pickled object), so they stay in
+#   band. Wrap them in a `memoryview` to send them out of band.
+# * Payloads are restored with `memoryview.cast(format, shape)`, so the
+#   formats it can't produce (e.g. `array('u')`) stay in band.
+# * Modes only exist for the type checker, so the receiver chooses them:
+#   * `loads_rk` restores the payloads as read-only `memoryview`s over the
+#     received buffers: no copies, and RK data can't be written by mistake.
+#     (`array.array`s become `memoryview`s cast to the same typecode.)
+#   * `loads_wk` restores the original types, which own their data, so each
+#     payload is copied once.
+# * Payloads smaller than `min_oob` bytes stay in band, and so do the
+#   non-contiguous `memoryview`s (copied in C order: they're restored
+#   contiguous). The `memoryview`s with formats `cast` can't produce can't be
+#   pickled at all, as with `pickle.dumps`.
+# * Run "python mutability_pickle.py --bench [MB ...]" for the benchmarks.
+
+_MIN_OOB = 4096
+
+def _cast(buf: Any, fmt: str, shape: tuple[int, ...]) -> memoryview:
+    # NOTE: `fmt` was checked by `_castable` when pickling
+    return memoryview(buf).cast('B').cast(
+        fmt, shape)    # pyright: ignore[reportCallIssue, reportArgumentType]
+
+_castable_cache: dict[str, bool] = {}
+
+def _castable(fmt: str) -> bool:
+    ok = _castable_cache.get(fmt)
+    if ok is None:
+        try:
+            _cast(bytes(struct.calcsize(fmt)), fmt, (1,))
+            ok = True
+        except (struct.error, TypeError, ValueError):
+            ok = False
+        _castable_cache[fmt] = ok
+    return ok
+
+def _rebuild(kind: str, fmt: str, shape: tuple[int, ...], buf: Any) -> Any:
+    """Used by `loads_wk` (see `_Unpickler`)."""
+    if kind == 'array':
+        a = array(fmt)
+        a.frombytes(buf)
+        return a
+    return _cast(bytearray(buf), fmt, shape)
+
+def _rebuild_rk(kind: str, fmt: str, shape: tuple[int, ...], buf: Any
+                ) -> Any:
+    return _cast(memoryview(buf).toreadonly(), fmt, shape)
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, buffers: list[PickleBuffer],
+                 min_oob: int) -> None:
+        super().__init__(file, protocol=5, buffer_callback=buffers.append)
+        self._min_oob = min_oob
+
+    def reducer_override(self, obj: Any) -> Any:
+        cls = type(obj)
+        if cls is array:
+            if (obj.itemsize * len(obj) >= self._min_oob
+                    and _castable(obj.typecode)):
+                return _rebuild, ('array', obj.typecode, (len(obj),),
+                                  PickleBuffer(obj))
+        elif cls is memoryview and _castable(obj.format):
+            if obj.nbytes >= self._min_oob and obj.c_contiguous:
+                buf = PickleBuffer(obj.cast('B'))
+            else:
+                buf = obj.tobytes()         # in band, in C order
+            return _rebuild, ('memoryview', obj.format, obj.shape, buf)
+        return NotImplemented
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module_name: str, global_name: str, /) -> Any:
+        if module_name == __name__ and global_name == '_rebuild':
+            return _rebuild_rk
+        return super().find_class(module_name, global_name)
+
+def dumps(obj: Any, *, min_oob: int = _MIN_OOB
+          ) -> tuple[bytes, list[PickleBuffer]]:
+    """Returns the pickled `obj` and its out-of-band buffers."""
+    f = io.BytesIO()
+    buffers: list[PickleBuffer] = []
+    _Pickler(f, buffers, min_oob).dump(obj)
+    return f.getvalue(), buffers
+
+def loads_rk(data: bytes, buffers: Iterable[Any]) -> Any:
+    """Unpickles with the payloads as read-only views over `buffers`."""
+    return _Unpickler(io.BytesIO(data), buffers=buffers).load()
+
+def loads_wk(data: bytes, buffers: Iterable[Any]) -> Any:
+    """Unpickles with the payloads copied into their original types."""
+    return pickle.loads(data, buffers=buffers)
+
+def _bench(sizes_mb: list[int]) -> None:
+    import tracemalloc
+    from time import perf_counter
+
+    def measure(f: Any) -> tuple[float, float]:
+        tracemalloc.start()
+        t = perf_counter()
+        f()
+        t = perf_counter() - t
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return t, peak / 2**20
+
+    print(f'{"MB":>6} {"method":>10} {"dump+load (s)":>14} {"MB/s":>8} '
+          f'{"peak (MB)":>10}')
+    for mb in sizes_mb:
+        n = mb * 2**20 // 8
+        obj = {'col': array('d', bytes(n * 8)), 'meta': list(range(100))}
+
+        def std() -> None:
+            pickle.loads(pickle.dumps(obj, protocol=5))
+
+        def oob_rk() -> None:
+            # NOTE: the buffers are handed over in-process, as they would be
+            #   through shared memory
+            data, bufs = dumps(obj)
+            loads_rk(data, [b.raw() for b in bufs])
+
+        def oob_wk() -> None:
+            data, bufs = dumps(obj)
+            loads_wk(data, [b.raw() for b in bufs])
+
+        for name, f in (('pickle', std), ('oob-rk', oob_rk),
+                        ('oob-wk', oob_wk)):
+            t, peak = measure(f)
+            print(f'{mb:>6} {name:>10} {t:>14.4f} {mb / t:>8.0f} '
+                  f'{peak:>10.1f}')
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--bench']:
+        _bench([int(x) for x in sys.argv[2:]] or [1, 16, 128])
+    else:
+        from mutability import lift, rk
+
+        big = array('i', range(10_000))
+        ba = bytearray(b'x' * 5000)
+        xs = rk(lift([big, memoryview(ba), array('b', [1]), 'small']))
+        data, bufs = dumps(xs)
+        assert len(bufs) == 2 and len(data) < 1000
+
+        ys = loads_rk(data, [b.raw() for b in bufs])
+        assert type(ys) is list and ys[3] == 'small'
+        assert ys[2] == array('b', [1])             # in band
+        assert ys[0].readonly and ys[0].format == 'i' and ys[0][9999] == 9999
+        assert ys[0].obj is bufs[0].raw().obj     # zero-copy
+        try:
+            ys[1][0] = 0
+        except TypeError:
+            pass
+        else:
+            assert False
+
+        zs = loads_wk(data, [b.raw() for b in bufs])
+        assert zs[0] == big and bytes(zs[1]) == ba and not zs[1].readonly
+        zs[0][0] = 7
+        assert big[0] == 0
+
+        mv = memoryview(array('d', [1.5] * 1000))
+        m2 = loads_rk(*dumps(mv))
+        assert m2.format == 'd' and m2.tolist() == mv.tolist()
+
+        grid = memoryview(array('d', range(1200))).cast('B').cast('d', (30, 40))
+        for loads in (loads_rk, loads_wk):
+            g2 = loads(*dumps(grid))
+            assert g2.shape == (30, 40) and g2.tolist() == grid.tolist()
+
+        small = memoryview(b'abc')
+        strided = memoryview(bytearray(range(256)) * 32)[::2]
+        data, bufs = dumps([small, strided])
+        assert not bufs                             # in band
+        for loads in (loads_rk, loads_wk):
+            s2, st2 = loads(data, bufs)
+            assert bytes(s2) == b'abc' and st2.tolist() == strided.tolist()
+            assert st2.c_contiguous and st2.readonly == (loads is loads_rk)
+
+        us = array('u', 'x' * 5000)     # pyright: ignore[reportDeprecated]
+        data, bufs = dumps([us])
+        assert not bufs                             # in band
+        assert loads_rk(data, bufs) == loads_wk(data, bufs) == [us]
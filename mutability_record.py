@@ -0,0 +1,182 @@
+from __future__ import annotations
+import keyword
+import sys
+from typing import Any, Iterable
+
+from mutability import *
+
+__all__ = ['record_source', 'reg_source', 'lifted_record']
+
+# NOTE:
+# * A lifted record is a lifted class (see "mutability_example2.py") whose
+#   state is a fixed list of fields: each field gets an R getter and a setter
+#   gated by `W` and by its own lock.
+# * We generate *source code* rather than building the class in a decorator
+#   because the type checker must see the `self: X_[W, _Ln]` annotations of
+#   the setters. The intended workflow is
+#       python mutability_record.py Point_ x:int y:int > point.py
+#       python mutability_record.py --reg Point_ >> (the do_conv overloads)
+#   `lifted_record` builds the same class at runtime, e.g. for scripts that
+#   aren't type-checked.
+# * The class has `__slots__`, so an instance takes about as much memory as
+#   a tuple with the same number of items, and `@lifted`, so `X_[M, L](...)`
+#   costs the same as `X_(...)`.
+
+_HEADER = '''\
+from __future__ import annotations
+from typing import Generic, Any
+
+from mutability import *
+'''
+
+# NOTE: `copy` is a generated method, and `self` and `other` are the names of
+#   the parameters of the generated methods.
+_RESERVED = frozenset({'copy', 'self', 'other'})
+
+def _check_name(name: str) -> None:
+    if not name.isidentifier() or keyword.iskeyword(name):
+        raise ValueError(f'invalid record name: {name!r}')
+
+def _parse_fields(fields: dict[str, str] | Iterable[tuple[str, str]]
+                  ) -> list[tuple[str, str]]:
+    items: list[tuple[str, str]] = []
+    for fname, t in fields.items() if isinstance(fields, dict) else fields:
+        if (not isinstance(fname, str) or not fname.isidentifier()
+                or fname.startswith('_') or keyword.iskeyword(fname)
+                or fname in _RESERVED):
+            raise ValueError(f'invalid field name: {fname!r}')
+        items.append((fname, t))
+    if not items:
+        raise ValueError('a record needs at least one field')
+    return items
+
+def record_source(name: str,
+                  fields: dict[str, str] | Iterable[tuple[str, str]], *,
+                  header: bool = True) -> str:
+    """Returns the source of the lifted record `name` with the given
+    `(field name, type expression)` pairs."""
+    _check_name(name)
+    items = _parse_fields(fields)
+    slots = ', '.join(f"'_{f}'" for f, _ in items)
+    if len(items) == 1:
+        slots += ','
+    params = ', '.join(f'{f}: {t}' for f, t in items)
+    own = ', '.join(f'self._{f}' for f, _ in items)
+    other = ', '.join(f'other._{f}' for f, _ in items)
+    args = own
+    if len(items) == 1:
+        own += ','
+        other += ','
+
+    out: list[str] = []
+    if header:
+        out.append(_HEADER)
+    out.append(f'type {name}out[M: (R, W, RK, WK)] = {name}[M, None]')
+    out.append(f'type {name}r = {name}[R, Any]')
+    out.append('')
+    out.append('@lifted')
+    out.append(f'class {name}(Generic[Mut_M, Mut_L]):')
+    out.append(f'    __slots__ = ({slots})')
+    out.append('')
+    for f, t in items:
+        out.append(f'    _{f}: {t}')
+    out.append('')
+    out.append(f'    def __init__(self, {params}) -> None:')
+    for f, _ in items:
+        out.append(f'        self._{f} = {f}')
+    for i, (f, t) in enumerate(items, 1):
+        out.append('')
+        out.append('    @property')
+        out.append(f'    def {f}(self) -> {t}:')
+        out.append(f'        return self._{f}')
+        out.append('')
+        out.append(f'    class _L{i}: ...')
+        out.append(f'    @{f}.setter')
+        out.append(f'    def {f}(self: {name}[W, _L{i}], {f}: {t}) -> None:')
+        out.append(f'        self._{f} = {f}')
+    out.append('')
+    out.append(f'    def copy(self) -> {name}out[WK]:')
+    out.append(f'        return {name}({args})')
+    out.append('')
+    out.append('    def __eq__(self, other: object) -> bool:')
+    out.append(f'        return (isinstance(other, {name})')
+    out.append(f'                and ({own}) == ({other}))')
+    out.append('')
+    out.append('    def __repr__(self) -> str:')
+    fmt = ', '.join(f'{f}={{self._{f}!r}}' for f, _ in items)
+    out.append(f"        return f'{name}({fmt})'")
+    return '\n'.join(out) + '\n'
+
+def reg_source(name: str, module: str | None = None) -> str:
+    """Returns the `do_conv` overload that registers `name` (to be added to
+    "mutability_reg.py")."""
+    _check_name(name)
+    if module is not None and not all(
+            map(str.isidentifier, module.split('.'))):
+        raise ValueError(f'invalid module name: {module!r}')
+    out: list[str] = []
+    if module is not None:
+        out.append(f'from {module} import {name}')
+    out.append('@overload')
+    out.append(f'def do_conv(obj: {name}[Mut_M, Mut_L], m2: Mut_M2, '
+               'd2: Mut_L2')
+    out.append(f'            ) -> tuple[Mut_M, {name}[Mut_M2, Mut_L2]]: ...')
+    return '\n'.join(out) + '\n'
+
+def lifted_record(name: str, /, **fields: str) -> Any:
+    """Builds the lifted record `name` at runtime (see `record_source`)."""
+    # NOTE: `sys._getframe` is documented; `inspect` would be much slower
+    caller = sys._getframe(1)       # pyright: ignore[reportPrivateUsage]
+    module = caller.f_globals.get('__name__', __name__)
+    ns: dict[str, Any] = {'__name__': module}
+    exec(record_source(name, fields), ns)       # pylint: disable=W0122
+    return ns[name]
+
+def _main(argv: list[str]) -> None:
+    if argv[:1] == ['--reg']:
+        sys.stdout.write(reg_source(argv[1],
+                                    argv[2] if len(argv) > 2 else None))
+        return
+    name, *specs = argv
+    fields: list[tuple[str, str]] = []
+    for spec in specs:
+        fname, sep, t = spec.partition(':')
+        if not sep:
+            raise SystemExit(f'expected FIELD:TYPE, got {spec!r}')
+        fields.append((fname, t))
+    sys.stdout.write(record_source(name, fields))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _main(sys.argv[1:])
+    else:
+        P_ = lifted_record('P_', x='int', y='float')
+        p = P_[WK, None](1, 2.5)
+        assert type(p) is P_ and (p.x, p.y) == (1, 2.5)
+        w(p).x = 3      # pyright: ignore[reportAttributeAccessIssue]  `p` is Any
+        q = p.copy()
+        assert q == p and q is not p and repr(q) == 'P_(x=3, y=2.5)'
+        assert not hasattr(p, '__dict__')
+        assert sys.getsizeof(p) <= sys.getsizeof((1, 2.5))
+        S_ = lifted_record('S_', s='str')
+        assert S_('a').copy().s == 'a'
+        for bad in ('copy', 'self', 'other', 'class', '__init__', 'x y'):
+            try:
+                lifted_record('B_', **{bad: 'int'})
+            except ValueError:
+                pass
+            else:
+                assert False
+        for name in ('class', 'E_(object): pass\n#', '1P'):
+            try:
+                lifted_record(name, x='int')
+            except ValueError:
+                pass
+            else:
+                assert False
+        try:
+            lifted_record('E_')
+        except ValueError:
+            pass
+        else:
+            assert False
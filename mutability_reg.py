@@ -1,11 +1,15 @@
-from typing import overload, Any, TypeVar
+from typing import overload, Any, TypeVar, TYPE_CHECKING
 
 from mutability_tvars import Mut_M, Mut_L, Mut_M2, Mut_L2
 from mutability_example import A_
 from mutability_example2 import A_ as A2_
+from mutability_example3 import Point_
 from mutability_list import list_
+from mutability_ilist import ilist_
 from mutability_set import set_
 from mutability_dict import dict_
+from mutability_sorted import sortedlist_, sortedset_, sorteddict_
+from mutability_table import table_
 
 # NOTE:
 # * W and RK are subtypes of R; WK is a subtype of W and RK.
@@ -19,11 +23,17 @@ from mutability_dict import dict_
 #   for any `M` in {`R`, `W`, `RK`, `WK`}`.
 # * See also "mutability.py".
 
+if TYPE_CHECKING:
+    from _typeshed import SupportsRichComparison
+
 _T1 = TypeVar('_T1')
 _T2 = TypeVar('_T2')
+_S1 = TypeVar('_S1', bound='SupportsRichComparison')     # sorted keys
 
 class Liftable[T]: ...
 
+# NOTE: `r(x)`, `w(x)`, ... with an `Any` `x` resolve to the first overload,
+#   so the builtin containers must stay first.
 @overload
 def do_conv(obj: Liftable[dict[_T1, _T2]] | dict_[_T1, _T2, Mut_M, Mut_L],
             m2: Mut_M2, d2: Mut_L2
@@ -32,11 +42,30 @@ def do_conv(obj: Liftable[dict[_T1, _T2]] | dict_[_T1, _T2, Mut_M, Mut_L],
 def do_conv(obj: Liftable[set[_T1]] | set_[_T1, Mut_M, Mut_L],
             m2: Mut_M2, d2: Mut_L2
             ) -> tuple[Mut_M, set_[_T1, Mut_M2, Mut_L2]]: ...
+# NOTE: `ilist_` must precede `list_`, since it's a subtype of `list_`
+@overload
+def do_conv(obj: ilist_[_T1, Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, ilist_[_T1, Mut_M2, Mut_L2]]: ...
 @overload
 def do_conv(obj: Liftable[list[_T1]] | list_[_T1, Mut_M, Mut_L],
             m2: Mut_M2, d2: Mut_L2
             ) -> tuple[Mut_M, list_[_T1, Mut_M2, Mut_L2]]: ...
 @overload
+def do_conv(obj: sorteddict_[_S1, _T2, Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, sorteddict_[_S1, _T2, Mut_M2, Mut_L2]]: ...
+@overload
+def do_conv(obj: sortedset_[_S1, Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, sortedset_[_S1, Mut_M2, Mut_L2]]: ...
+@overload
+def do_conv(obj: sortedlist_[_S1, Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, sortedlist_[_S1, Mut_M2, Mut_L2]]: ...
+@overload
+def do_conv(obj: table_[_T1, Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, table_[_T1, Mut_M2, Mut_L2]]: ...
+@overload
+def do_conv(obj: Point_[Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
+            ) -> tuple[Mut_M, Point_[Mut_M2, Mut_L2]]: ...
+@overload
 def do_conv(obj: A2_[Mut_M, Mut_L], m2: Mut_M2, d2: Mut_L2
             ) -> tuple[Mut_M, A2_[Mut_M2, Mut_L2]]: ...
 @overload
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, assert_type, Literal as L, Any
-from mutability import *
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+    from mutability import *
 
 __all__ = ['set_', 'set_out', 'set_r']
 
@@ -73,6 +75,9 @@ else:
     set_ = set_out = set_r = set
 
 if __name__ == "__main__":
+    from typing import assert_type, Literal as L, Any
+    from mutability import *
+
     a = lift(set([1, 2, 3]))
     a_r = r(a)
     a_w = w(a)
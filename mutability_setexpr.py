@@ -0,0 +1,254 @@
+from __future__ import annotations
+from typing import (
+    TYPE_CHECKING, AbstractSet, Any, ClassVar, Iterable, Iterator
+)
+
+from mutability import *
+from mutability_set import *
+
+__all__ = ['SetExpr', 'set_expr']
+
+# NOTE:
+# * The set operations of `set_` build a whole new `set_out[..., WK]` each, so
+#   `(a & b & c) - d` allocates 3 sets. `(set_expr(a) & b & c) - d` builds
+#   an operator tree instead, which is evaluated only on demand:
+#   * `x in e` is answered by the tree itself, with short-circuiting.
+#   * iteration (and thus `len`, `isdisjoint`, `issubset`, ...) visits each
+#     element of the result once, without materializing it.
+#   * `copy()` materializes the result as a `set_out[T, WK]`.
+# * N-ary intersections are reordered from the (estimated) smallest operand
+#   to the largest: we iterate over the smallest and test membership in the
+#   others.
+# * Only the operations involving a `SetExpr` are lazy: in
+#   `set_expr(a) & (b - c)`, `b - c` is still computed eagerly.
+# * The leaves are R values, i.e. the expression must be evaluated before the
+#   function that received them returns.
+
+_LEAF, _AND, _OR, _SUB, _XOR = range(5)
+
+# NOTE: `set_` is not an `AbstractSet` in the stubs
+type _Operand[S] = AbstractSet[S] | set_r[S] | SetExpr[S]
+
+class SetExpr[T]:
+    __slots__ = ('_op', '_args', '_size')
+
+    _op: int
+    _args: tuple[Any, ...]
+    _size: int                      # upper bound on the size of the result
+
+    def __init__(self, op: int, args: tuple[Any, ...]) -> None:
+        self._op = op
+        if op == _AND:
+            # flatten and order from smallest to largest
+            flat: list[Any] = []
+            for a in args:
+                if a._op == _AND:
+                    flat.extend(a._args)
+                else:
+                    flat.append(a)
+            flat.sort(key=lambda a: a._size)
+            args = tuple(flat)
+            size = args[0]._size
+        elif op == _OR:
+            flat = []
+            for a in args:
+                if a._op == _OR:
+                    flat.extend(a._args)
+                else:
+                    flat.append(a)
+            args = tuple(flat)
+            size = sum(a._size for a in args)
+        elif op == _SUB:
+            size = args[0]._size
+        elif op == _XOR:
+            size = args[0]._size + args[1]._size
+        else:
+            size = len(args[0])
+        self._args = args
+        self._size = size
+
+    # construction
+
+    def __and__(self, value: _Operand[Any], /
+                ) -> SetExpr[T]:
+        return SetExpr(_AND, (self, _as_expr(value)))
+
+    def __or__[S](self, value: _Operand[S], /
+                  ) -> SetExpr[T | S]:
+        return SetExpr(_OR, (self, _as_expr(value)))
+
+    def __sub__(self, value: _Operand[Any], /
+                ) -> SetExpr[T]:
+        return SetExpr(_SUB, (self, _as_expr(value)))
+
+    def __xor__[S](self, value: _Operand[S], /
+                   ) -> SetExpr[T | S]:
+        return SetExpr(_XOR, (self, _as_expr(value)))
+
+    def __rand__(self, value: _Operand[Any], /
+                 ) -> SetExpr[T]:
+        return SetExpr(_AND, (_as_expr(value), self))
+
+    def __ror__[S](self, value: _Operand[S], /
+                   ) -> SetExpr[T | S]:
+        return SetExpr(_OR, (_as_expr(value), self))
+
+    def __rsub__[S](self, value: _Operand[S], /
+                    ) -> SetExpr[S]:
+        return SetExpr(_SUB, (_as_expr(value), self))
+
+    def __rxor__[S](self, value: _Operand[S], /
+                    ) -> SetExpr[T | S]:
+        return SetExpr(_XOR, (_as_expr(value), self))
+
+    def intersection(self, *s: _Operand[Any]) -> SetExpr[T]:
+        return SetExpr(_AND, (self,) + tuple(map(_as_expr, s)))
+
+    def union[S](self, *s: _Operand[S]) -> SetExpr[T | S]:
+        return SetExpr(_OR, (self,) + tuple(map(_as_expr, s)))
+
+    def difference(self, *s: _Operand[Any]) -> SetExpr[T]:
+        e = self
+        for x in s:
+            e = SetExpr(_SUB, (e, _as_expr(x)))
+        return e
+
+    def symmetric_difference[S](self, s: _Operand[S], /
+                                ) -> SetExpr[T | S]:
+        return SetExpr(_XOR, (self, _as_expr(s)))
+
+    # evaluation
+
+    def __contains__(self, o: object, /) -> bool:
+        op = self._op
+        args = self._args
+        if op == _LEAF:
+            return o in args[0]
+        if op == _AND:
+            return all(o in a for a in args)
+        if op == _OR:
+            return any(o in a for a in args)
+        if op == _SUB:
+            return o in args[0] and o not in args[1]
+        return (o in args[0]) != (o in args[1])
+
+    def __iter__(self) -> Iterator[T]:
+        op = self._op
+        args = self._args
+        if op == _LEAF:
+            return iter(args[0])
+        if op == _AND:
+            first, rest = args[0], args[1:]
+            return (x for x in first if all(x in a for a in rest))
+        if op == _OR:
+            return self._iter_or()
+        if op == _SUB:
+            a, b = args
+            return (x for x in a if x not in b)
+        return self._iter_xor()
+
+    def _iter_or(self) -> Iterator[T]:
+        # NOTE: an element of `args[i]` is yielded only if it's not in
+        #   `args[:i]`, so no `seen` set is needed
+        args = self._args
+        for i, a in enumerate(args):
+            prev = args[:i]
+            for x in a:
+                if not any(x in p for p in prev):
+                    yield x
+
+    def _iter_xor(self) -> Iterator[T]:
+        a, b = self._args
+        for x in a:
+            if x not in b:
+                yield x
+        for x in b:
+            if x not in a:
+                yield x
+
+    def __len__(self) -> int:
+        if self._op == _LEAF:
+            return len(self._args[0])
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        for _ in self:
+            return True
+        return False
+
+    def isdisjoint(self, s: Iterable[Any], /) -> bool:
+        if not isinstance(s, (set, frozenset, SetExpr)):
+            s = set(s)
+        if isinstance(s, SetExpr) and s._size < self._size:
+            return not any(x in self for x in s)
+        return not any(x in s for x in self)
+
+    def issubset(self, s: Iterable[Any], /) -> bool:
+        if not isinstance(s, (set, frozenset, SetExpr)):
+            s = set(s)
+        return all(x in s for x in self)
+
+    def issuperset(self, s: Iterable[Any], /) -> bool:
+        return all(x in self for x in s)
+
+    def copy(self) -> set_out[T, WK]:
+        if self._op == _LEAF:
+            return lift(set(self._args[0]))
+        return lift(set(self))
+
+    def __eq__(self, value: object, /) -> bool:
+        if not isinstance(value, (set, frozenset, SetExpr)):
+            return NotImplemented
+        return self.copy() == (value.copy() if isinstance(value, SetExpr)
+                               else value)
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __repr__(self) -> str:
+        return f'set_expr({set(self)!r})'
+
+def _as_expr(s: Any) -> SetExpr[Any]:
+    return s if isinstance(s, SetExpr) else SetExpr(_LEAF, (s,))
+
+if TYPE_CHECKING:
+    def set_expr[T](s: set_r[T], /) -> SetExpr[T]:
+        """Starts a lazy expression from `s`."""
+        ...             # pylint: disable=W2301
+else:
+    def set_expr(s, /):
+        return _as_expr(s)
+
+if __name__ == "__main__":
+    from typing import assert_type
+
+    big = lift(set(range(100_000)))
+    evens = lift(set(range(0, 100_000, 2)))
+    small = lift({1, 2, 3, 4, 5, 6})
+    banned = lift({4})
+
+    e = (set_expr(big) & evens & small) - banned
+    assert_type(e, SetExpr[int])
+    assert e._args[0]._args[0]._args[0] is small       # pyright: ignore[reportPrivateUsage]  smallest first
+    assert 2 in e and 4 not in e and 3 not in e
+    assert len(e) == 2 and set(e) == {2, 6}
+    res = e.copy()
+    assert_type(res, set_[int, WK, None])
+    assert res == {2, 6} and e == res
+
+    u = set_expr(small) | banned | {7}
+    assert sorted(u) == [1, 2, 3, 4, 5, 6, 7] and len(u) == 7
+    x = set_expr(small) ^ {6, 8}
+    assert set(x) == {1, 2, 3, 4, 5, 8}
+    assert set_expr(small).difference(banned, {1}) == {2, 3, 5, 6}
+    assert set_expr(small).union(banned).intersection(evens) == {2, 4, 6}
+
+    assert e.isdisjoint({1, 3}) and not e.isdisjoint([2])
+    assert e.issubset(evens) and set_expr(big).issuperset(e)
+    assert not set_expr(small) & {100}
+
+    # reflected: the plain set is on the left
+    assert_type({7} | set_expr(small), SetExpr[int])
+    assert set({7} | set_expr(small)) == {1, 2, 3, 4, 5, 6, 7}
+    assert set({2, 3, 9} & set_expr(small)) == {2, 3}
+    assert set({4, 9} - set_expr(small)) == {9}
+    assert set({6, 8} ^ set_expr(small)) == {1, 2, 3, 4, 5, 8}
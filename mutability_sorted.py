@@ -0,0 +1,428 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right, insort
+from typing import (
+    TYPE_CHECKING, Any, ClassVar, Generic, Iterable, Iterator, TypeVar,
+    overload, cast
+)
+
+from mutability import *
+from mutability_list import list_out
+
+__all__ = [
+    'sortedlist_', 'sortedlist_out', 'sortedlist_r',
+    'sortedset_', 'sortedset_out', 'sortedset_r',
+    'sorteddict_', 'sorteddict_out', 'sorteddict_r',
+]
+
+# NOTE:
+# * These lifted types keep their elements (keys, for `sorteddict_`) sorted
+#   under W, so there's no need to call `sort()` after each batch of inserts.
+# * They're backed by a flat sorted list: searches are O(log n) and inserts and
+#   removals are O(log n) comparisons plus a `memmove` of the tail, which is
+#   very fast in practice. A large batch (`update`) is appended and re-sorted
+#   in O(n) by Timsort instead.
+# * Under R, they offer range queries (`irange`), rank/select (`rank`,
+#   `select`) and nearest-element lookups (`floor`, `ceiling`, `lower`,
+#   `higher`).
+# * The elements (keys) must be totally ordered (`SupportsRichComparison`,
+#   as for `list_.sort`).
+
+if TYPE_CHECKING:
+    from _typeshed import SupportsRichComparison
+
+_T = TypeVar('_T', bound='SupportsRichComparison')
+_K = TypeVar('_K', bound='SupportsRichComparison')
+_V = TypeVar('_V')
+
+type sortedlist_out[T: SupportsRichComparison, M: (R, W, RK, WK)] = \
+    sortedlist_[T, M, None]
+type sortedlist_r[T: SupportsRichComparison] = sortedlist_[T, R, Any]
+type sortedset_out[T: SupportsRichComparison, M: (R, W, RK, WK)] = \
+    sortedset_[T, M, None]
+type sortedset_r[T: SupportsRichComparison] = sortedset_[T, R, Any]
+type sorteddict_out[K: SupportsRichComparison, V, M: (R, W, RK, WK)] = \
+    sorteddict_[K, V, M, None]
+type sorteddict_r[K: SupportsRichComparison, V] = sorteddict_[K, V, R, Any]
+
+def _insert_many(keys: list[Any], new: list[Any]) -> None:
+    if len(new) * 8 > len(keys):
+        keys.extend(new)
+        keys.sort()
+    else:
+        for x in new:
+            insort(keys, x)
+
+class _sorted_queries(Generic[_T]):
+    """R queries over `_keys`, which must be sorted."""
+    __slots__ = ()
+
+    _keys: list[_T]
+
+    def irange(self, lo: _T | None = None, hi: _T | None = None,
+               inclusive: tuple[bool, bool] = (True, True)) -> Iterator[_T]:
+        """Iterates over the elements in [`lo`, `hi`] (by default)."""
+        keys = self._keys
+        if lo is None:
+            i = 0
+        else:
+            i = (bisect_left if inclusive[0] else bisect_right)(keys, lo)
+        if hi is None:
+            j = len(keys)
+        else:
+            j = (bisect_right if inclusive[1] else bisect_left)(keys, hi)
+        return map(keys.__getitem__, range(i, j))
+
+    def rank(self, value: _T) -> int:
+        """Number of elements < `value`."""
+        return bisect_left(self._keys, value)
+
+    def select(self, i: int) -> _T:
+        """The element of rank `i`."""
+        return self._keys[i]
+
+    def floor(self, value: _T) -> _T | None:
+        """Greatest element <= `value`."""
+        i = bisect_right(self._keys, value)
+        return self._keys[i - 1] if i else None
+
+    def ceiling(self, value: _T) -> _T | None:
+        """Least element >= `value`."""
+        i = bisect_left(self._keys, value)
+        return self._keys[i] if i < len(self._keys) else None
+
+    def lower(self, value: _T) -> _T | None:
+        """Greatest element < `value`."""
+        i = bisect_left(self._keys, value)
+        return self._keys[i - 1] if i else None
+
+    def higher(self, value: _T) -> _T | None:
+        """Least element > `value`."""
+        i = bisect_right(self._keys, value)
+        return self._keys[i] if i < len(self._keys) else None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+@lifted
+class sortedlist_(_sorted_queries[_T], Generic[_T, Mut_M, Mut_L]):
+    __slots__ = ('_keys',)
+
+    class _L: ...       # lock
+
+    def __init__(self, iterable: Iterable[_T] = (), /) -> None:
+        self._keys = sorted(iterable)
+
+    def copy(self) -> sortedlist_out[_T, WK]:
+        res = sortedlist_[_T, WK, None]()
+        res._keys = self._keys.copy()
+        return res
+
+    def add(self: sortedlist_[_T, W, _L], value: _T, /) -> None:
+        insort(self._keys, value)
+
+    def update(self: sortedlist_[_T, W, _L], iterable: Iterable[_T], /
+               ) -> None:
+        _insert_many(self._keys, list(iterable))
+
+    def discard(self: sortedlist_[_T, W, _L], value: _T, /) -> None:
+        keys = self._keys
+        i = bisect_left(keys, value)
+        if i < len(keys) and keys[i] == value:
+            del keys[i]
+
+    def remove(self: sortedlist_[_T, W, _L], value: _T, /) -> None:
+        keys = self._keys
+        i = bisect_left(keys, value)
+        if i == len(keys) or keys[i] != value:
+            raise ValueError(f'{value!r} not in sortedlist_')
+        del keys[i]
+
+    def pop(self: sortedlist_[_T, W, _L], index: int = -1, /) -> _T:
+        return self._keys.pop(index)
+
+    def clear(self: sortedlist_[_T, W, _L]) -> None:
+        self._keys.clear()
+
+    def __delitem__(self: sortedlist_[_T, W, _L], key: int | slice, /
+                    ) -> None:
+        del self._keys[key]
+
+    def index(self, value: _T) -> int:
+        keys = self._keys
+        i = bisect_left(keys, value)
+        if i == len(keys) or keys[i] != value:
+            raise ValueError(f'{value!r} not in sortedlist_')
+        return i
+
+    def count(self, value: _T) -> int:
+        keys = self._keys
+        return bisect_right(keys, value) - bisect_left(keys, value)
+
+    def __contains__(self, value: Any, /) -> bool:
+        keys = self._keys
+        i = bisect_left(keys, value)
+        return i < len(keys) and keys[i] == value
+
+    def __iter__(self) -> Iterator[_T]:
+        return iter(self._keys)
+
+    def __reversed__(self) -> Iterator[_T]:
+        return reversed(self._keys)
+
+    @overload
+    def __getitem__(self, i: int, /) -> _T: ...
+    @overload
+    def __getitem__(self, s: slice, /) -> list_out[_T, WK]: ...
+    def __getitem__(self, s, /) -> Any:
+        return self._keys[s]
+
+    def __eq__(self, value: object, /) -> bool:
+        if not isinstance(value, sortedlist_):
+            return NotImplemented
+        return self._keys == cast(sortedlist_[Any, Any, Any], value)._keys
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __repr__(self) -> str:
+        return f'sortedlist_({self._keys!r})'
+
+@lifted
+class sortedset_(_sorted_queries[_T], Generic[_T, Mut_M, Mut_L]):
+    __slots__ = ('_keys', '_set')
+
+    class _L: ...       # lock
+
+    _set: set[_T]
+
+    def __init__(self, iterable: Iterable[_T] = (), /) -> None:
+        self._set = set(iterable)
+        self._keys = sorted(self._set)
+
+    def copy(self) -> sortedset_out[_T, WK]:
+        res = sortedset_[_T, WK, None]()
+        res._keys = self._keys.copy()
+        res._set = self._set.copy()
+        return res
+
+    def add(self: sortedset_[_T, W, _L], value: _T, /) -> None:
+        if value not in self._set:
+            self._set.add(value)
+            insort(self._keys, value)
+
+    def update(self: sortedset_[_T, W, _L], iterable: Iterable[_T], /
+               ) -> None:
+        s = self._set
+        new = [x for x in set(iterable) if x not in s]
+        s.update(new)
+        _insert_many(self._keys, new)
+
+    def discard(self: sortedset_[_T, W, _L], value: _T, /) -> None:
+        if value in self._set:
+            self._set.remove(value)
+            del self._keys[bisect_left(self._keys, value)]
+
+    def remove(self: sortedset_[_T, W, _L], value: _T, /) -> None:
+        self._set.remove(value)
+        del self._keys[bisect_left(self._keys, value)]
+
+    def pop(self: sortedset_[_T, W, _L], index: int = -1, /) -> _T:
+        x = self._keys.pop(index)
+        self._set.remove(x)
+        return x
+
+    def clear(self: sortedset_[_T, W, _L]) -> None:
+        self._keys.clear()
+        self._set.clear()
+
+    def __contains__(self, value: object, /) -> bool:
+        return value in self._set
+
+    def __iter__(self) -> Iterator[_T]:
+        return iter(self._keys)
+
+    def __reversed__(self) -> Iterator[_T]:
+        return reversed(self._keys)
+
+    def __eq__(self, value: object, /) -> bool:
+        if isinstance(value, sortedset_):
+            return self._set == cast(sortedset_[Any, Any, Any], value)._set
+        if isinstance(value, (set, frozenset)):
+            return self._set == value
+        return NotImplemented
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __repr__(self) -> str:
+        return f'sortedset_({self._keys!r})'
+
+@lifted
+class sorteddict_(_sorted_queries[_K], Generic[_K, _V, Mut_M, Mut_L]):
+    __slots__ = ('_keys', '_map')
+
+    class _L: ...       # lock
+
+    _map: dict[_K, _V]
+
+    @overload
+    def __init__(self) -> None: ...
+    @overload
+    def __init__(self, map: dict[_K, _V], /) -> None: ...
+    @overload
+    def __init__(self, iterable: Iterable[tuple[_K, _V]], /) -> None: ...
+    def __init__(self, *args) -> None:
+        self._map = dict(*args)
+        self._keys = sorted(self._map)
+
+    def copy(self) -> sorteddict_out[_K, _V, WK]:
+        res = sorteddict_[_K, _V, WK, None]()
+        res._keys = self._keys.copy()
+        res._map = self._map.copy()
+        return res
+
+    def __setitem__(self: sorteddict_[_K, _V, W, _L], key: _K, value: _V, /
+                    ) -> None:
+        m = self._map
+        if key not in m:
+            insort(self._keys, key)
+        m[key] = value
+
+    def __delitem__(self: sorteddict_[_K, _V, W, _L], key: _K, /) -> None:
+        del self._map[key]
+        del self._keys[bisect_left(self._keys, key)]
+
+    @overload
+    def pop(self: sorteddict_[_K, _V, W, _L], key: _K, /) -> _V: ...
+    @overload
+    def pop[T](self: sorteddict_[_K, _V, W, _L], key: _K, default: T, /
+               ) -> _V | T: ...
+    def pop(self, key, *default) -> Any:
+        m = self._map
+        if key in m:
+            del self._keys[bisect_left(self._keys, key)]
+            return m.pop(key)
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self: sorteddict_[_K, _V, W, _L], index: int = -1, /
+                ) -> tuple[_K, _V]:
+        """Removes the item with the key of rank `index` (the last one by
+        default)."""
+        key = self._keys.pop(index)
+        return key, self._map.pop(key)
+
+    def setdefault(self: sorteddict_[_K, _V, W, _L], key: _K, default: _V, /
+                   ) -> _V:
+        m = self._map
+        if key not in m:
+            insort(self._keys, key)
+            m[key] = default
+            return default
+        return m[key]
+
+    def update(self: sorteddict_[_K, _V, W, _L],
+               other: dict[_K, _V] | Iterable[tuple[_K, _V]], /) -> None:
+        m = self._map
+        items: Iterable[tuple[_K, _V]] = (
+            cast(dict[_K, _V], other).items() if isinstance(other, dict)
+            else other)
+        new: list[_K] = []
+        for k, v in items:
+            if k not in m:
+                new.append(k)
+            m[k] = v
+        _insert_many(self._keys, list(dict.fromkeys(new)))
+
+    def clear(self: sorteddict_[_K, _V, W, _L]) -> None:
+        self._keys.clear()
+        self._map.clear()
+
+    def __getitem__(self, key: _K, /) -> _V:
+        return self._map[key]
+
+    @overload
+    def get(self, key: _K, /) -> _V | None: ...
+    @overload
+    def get[T](self, key: _K, default: T, /) -> _V | T: ...
+    def get(self, key, default=None, /) -> Any:
+        return self._map.get(key, default)
+
+    def __contains__(self, key: object, /) -> bool:
+        return key in self._map
+
+    def __iter__(self) -> Iterator[_K]:
+        return iter(self._keys)
+
+    def __reversed__(self) -> Iterator[_K]:
+        return reversed(self._keys)
+
+    def keys(self) -> Iterator[_K]:
+        return iter(self._keys)
+
+    def values(self) -> Iterator[_V]:
+        return map(self._map.__getitem__, self._keys)
+
+    def items(self) -> Iterator[tuple[_K, _V]]:
+        m = self._map
+        return ((k, m[k]) for k in self._keys)
+
+    def peekitem(self, index: int = -1) -> tuple[_K, _V]:
+        """The item with the key of rank `index` (the last one by default)."""
+        key = self._keys[index]
+        return key, self._map[key]
+
+    def __eq__(self, value: object, /) -> bool:
+        if isinstance(value, sorteddict_):
+            return self._map == cast(sorteddict_[Any, Any, Any, Any],
+                                     value)._map
+        if isinstance(value, dict):
+            return self._map == value
+        return NotImplemented
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __repr__(self) -> str:
+        return f'sorteddict_({dict(self.items())!r})'
+
+if __name__ == "__main__":
+    from typing import assert_type
+
+    xs = sortedlist_[int, WK, None]([5, 1, 4])
+    assert type(xs) is sortedlist_
+    xs_w = w(xs)
+    xs_w.add(3)
+    xs_w.update([9, 0, 4])
+    assert list(xs) == [0, 1, 3, 4, 4, 5, 9]
+    xs_w.discard(4)
+    xs_w.remove(9)
+    assert list(xs) == [0, 1, 3, 4, 5] and xs.count(4) == 1
+    assert list(xs.irange(1, 4)) == [1, 3, 4]
+    assert list(xs.irange(1, 4, (False, False))) == [3]
+    assert (xs.rank(3), xs.select(2)) == (2, 3)
+    assert (xs.floor(2), xs.ceiling(2), xs.lower(3), xs.higher(3)) \
+        == (1, 3, 1, 4)
+    assert xs.floor(-1) is None and xs.higher(5) is None
+    assert_type(xs.copy(), sortedlist_[int, WK, None])
+    assert xs.copy() == xs and 5 in xs and 2 not in xs
+
+    ss = sortedset_[str, WK, None](['b', 'a'])
+    w(ss).update(['c', 'a'])
+    w(ss).add('a')
+    assert list(ss) == ['a', 'b', 'c'] and ss == {'a', 'b', 'c'}
+    assert w(ss).pop(0) == 'a' and ss.ceiling('aa') == 'b'
+
+    ds = sorteddict_[int, str, WK, None]({3: 'c', 1: 'a'})
+    ds_w = w(ds)
+    ds_w[2] = 'b'
+    ds_w.update([(0, 'z'), (2, 'B')])
+    assert list(ds.items()) == [(0, 'z'), (1, 'a'), (2, 'B'), (3, 'c')]
+    del ds_w[1]
+    assert ds_w.pop(0) == 'z' and ds_w.pop(7, None) is None
+    assert ds.peekitem(0) == (2, 'B') and list(ds.irange(3)) == [3]
+    assert_type(ds.copy(), sorteddict_[int, str, WK, None])
+
+    wrong = False
+    if wrong:
+        xs.add(1)           # type: ignore      needs explicit permission
+        r(xs).add(1)        # type: ignore      read-only
+        r(ds)[0] = ''       # type: ignore      read-only
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from collections.abc import Mapping
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, overload
+
+from mutability import *
+from mutability_list import *
+from mutability_dict import *
+from mutability_set import *
+
+__all__ = ['Stream', 'stream']
+
+# NOTE:
+# * A `Stream` is a lazy pipeline: `map`, `filter`, `zip` and `take` just wrap
+#   the underlying iterator (with the builtin `map`, `filter`, ...), so all the
+#   stages run in a single pass and no intermediate containers are built.
+# * The result is materialized only by `to_list`, `to_set`, `to_dict` or
+#   `group_by`, as a new `X_out[..., WK]`.
+# * Streams are single-use, like iterators.
+# * `stream` takes an R source, i.e. temporary access: the stream must be
+#   consumed before the function that received the source returns.
+
+class Stream[T]:
+    __slots__ = ('_it',)
+
+    _it: Iterator[T]
+
+    def __init__(self, iterable: Iterable[T], /) -> None:
+        self._it = iter(iterable)
+
+    def __iter__(self) -> Iterator[T]:
+        return self._it
+
+    def map[S](self, f: Callable[[T], S]) -> Stream[S]:
+        return Stream(map(f, self._it))
+
+    def filter(self, pred: Callable[[T], Any]) -> Stream[T]:
+        return Stream(filter(pred, self._it))
+
+    def zip[S](self, other: Iterable[S]) -> Stream[tuple[T, S]]:
+        return Stream(zip(self._it, other))
+
+    def take(self, n: int) -> Stream[T]:
+        return Stream(islice(self._it, n))
+
+    def to_list(self) -> list_out[T, WK]:
+        return lift(list(self._it))
+
+    def to_set(self) -> set_out[T, WK]:
+        return lift(set(self._it))
+
+    def to_dict[K, V](self: Stream[tuple[K, V]]) -> dict_out[K, V, WK]:
+        return lift(dict(self._it))
+
+    def group_by[K](self, key: Callable[[T], K]
+                    ) -> dict_out[K, list_out[T, WK], WK]:
+        groups: dict[K, list[T]] = {}
+        for x in self._it:
+            k = key(x)
+            g = groups.get(k)
+            if g is None:
+                groups[k] = [x]
+            else:
+                g.append(x)
+        # NOTE: the groups are plain `list`s, which are `list_`s at runtime
+        return lift(groups)     # pyright: ignore[reportReturnType]
+
+if TYPE_CHECKING:
+    @overload
+    def stream[K, V](src: dict_r[K, V]) -> Stream[tuple[K, V]]: ...
+    @overload
+    def stream[T](src: set_r[T]) -> Stream[T]: ...
+    @overload
+    def stream[T](src: list_r[T]) -> Stream[T]: ...
+    def stream(src: Any) -> Any: ...
+else:
+    def stream(src):
+        """Returns a lazy `Stream` over `src` (over its items for dicts)."""
+        # NOTE: `Mapping`, for the R views (see "mutability_views.py")
+        return Stream(src.items() if isinstance(src, Mapping) else src)
+
+if __name__ == "__main__":
+    from typing import assert_type
+
+    xs = lift(list(range(10)))
+    ys = (stream(xs)
+          .map(lambda x: x * 2)
+          .filter(lambda x: x % 3 != 0)
+          .take(4)
+          .to_list())
+    assert_type(ys, list_[int, WK, None])
+    assert ys == [2, 4, 8, 10]
+
+    ds = lift({'a': 1, 'b': 2})
+    ds2 = stream(ds).map(lambda kv: (kv[0], kv[1] * 2)).to_dict()
+    assert_type(ds2, dict_[str, int, WK, None])
+    assert ds2 == {'a': 2, 'b': 4}
+
+    ss = lift({1, 2, 3})
+    assert stream(ss).zip('abc').take(1).to_list()[0][0] in ss
+
+    from mutability_views import r_merge, r_slice
+    assert stream(r_merge(ds, lift({'c': 3}))).to_dict() == {**ds, 'c': 3}
+    assert stream(r_slice(xs, 8)).to_list() == [8, 9]
+
+    gs = stream(xs).group_by(lambda x: x % 2)
+    assert_type(gs, dict_[int, list_[int, WK, None], WK, None])
+    assert gs[0] == [0, 2, 4, 6, 8]
+
+    _ = stream([1, 2])      # pyright: ignore      not lifted
@@ -0,0 +1,456 @@
+from __future__ import annotations
+import sys
+from array import array
+from itertools import compress
+from typing import (
+    Any, Callable, ClassVar, Generic, Iterable, Iterator, TypeVar, cast
+)
+
+from mutability import *
+from mutability_list import list_r
+from mutability_views import list_view
+
+__all__ = ['table_', 'table_out', 'table_r']
+
+# NOTE:
+# * A `table_[S, M, L]` stores records with the schema `S`, a `NamedTuple`,
+#   as a struct of arrays: one column per field, an `array.array` for the
+#   `int` ('q') and `float` ('d') fields and a `list` for the other ones.
+#   That's 8 bytes per number instead of a dict (plus a boxed value) per
+#   record.
+# * Rows are read as instances of `S`. Columns are handed out individually:
+#   `col(name)` is an O(1) R view (a `list_r`), while `col_w(name)` needs W
+#   and returns a fixed-length writable column.
+# * The bulk operations work column by column: whole columns are replaced by
+#   `array` slicing, filters use `compress`, and the keyed operations look up
+#   the rows once and then run a tight loop per column, instead of a dict
+#   lookup per record and field:
+#   * `assign(name, values)` replaces a whole column (a `memcpy`, if
+#     `values` is an `array` with the same typecode);
+#   * `assign(name, values, keys)` and `scatter(keys, src, names)` write the
+#     rows with the given keys (`scatter` is the columnar `update_keys`);
+#   * `filter(name, pred)`, `take(rows)` and `gather(keys)` return new
+#     tables.
+# * Keys are the values of the `key` column, which must be unique (the keyed
+#   operations raise `ValueError` otherwise). The key -> row index is built
+#   on first use and kept up to date by `append` and `extend`.
+# * Like any R value, a column view must not be used after the table is
+#   resized.
+# * Run "python mutability_table.py --bench" for the benchmarks.
+
+_S = TypeVar('_S')
+
+type table_out[S, M: (R, W, RK, WK)] = table_[S, M, None]
+type table_r[S] = table_[S, R, Any]
+
+# NOTE: the annotations may be strings, or `ForwardRef`s in a `NamedTuple`
+_TYPECODES: dict[Any, str] = {int: 'q', float: 'd', 'int': 'q', 'float': 'd'}
+
+def _new_column(typecode: str | None) -> Any:
+    return array(typecode) if typecode else []
+
+class _column:
+    """Fixed-length writable column (see `table_.col_w`)."""
+    __slots__ = ('_col', '_on_write')
+
+    def __init__(self, col: Any, on_write: Callable[[], None] | None
+                 ) -> None:
+        self._col = col
+        self._on_write = on_write
+
+    def __len__(self) -> int:
+        return len(self._col)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._col)
+
+    def __getitem__(self, i: Any) -> Any:
+        return self._col[i]
+
+    def __setitem__(self, i: Any, value: Any) -> None:
+        col = self._col
+        if isinstance(i, slice):
+            if not isinstance(col, array):
+                value = list(value)
+            elif not (isinstance(value, array)
+                      and value.typecode == col.typecode):
+                value = array(col.typecode, value)
+            if len(value) != len(range(len(col))[i]):
+                raise ValueError('a column must keep its length')
+        if self._on_write is not None:
+            self._on_write()
+        col[i] = value
+
+@lifted
+class table_(Generic[_S, Mut_M, Mut_L]):
+    __slots__ = ('_schema', '_names', '_typecodes', '_cols', '_key', '_index')
+
+    class _L: ...       # lock
+
+    _schema: Any
+    _names: tuple[str, ...]
+    _typecodes: tuple[str | None, ...]
+    _cols: list[Any]
+    _key: str | None
+    _index: dict[Any, int] | None
+
+    def __init__(self, schema: type[_S], rows: Iterable[_S] = (), /, *,
+                 key: str | None = None) -> None:
+        names = getattr(schema, '_fields', None)
+        if names is None:
+            raise TypeError('the schema must be a NamedTuple')
+        if key is not None and key not in names:
+            raise ValueError(f'unknown key column: {key!r}')
+        hints = schema.__annotations__
+        self._schema = schema
+        self._names = names
+        self._typecodes = tuple(
+            _TYPECODES.get(getattr(t, '__forward_arg__', t))
+            for t in map(hints.get, names)
+        )
+        self._cols = [_new_column(tc) for tc in self._typecodes]
+        self._key = key
+        self._index = None
+        self._extend(rows)
+
+    def _like(self) -> table_out[_S, WK]:
+        res = table_[_S, WK, None].__new__(table_)
+        res._schema = self._schema
+        res._names = self._names
+        res._typecodes = self._typecodes
+        res._key = self._key
+        res._index = None
+        return res
+
+    def _pos(self, name: str) -> int:
+        try:
+            return self._names.index(name)
+        except ValueError:
+            raise KeyError(name) from None
+
+    def _get_index(self) -> dict[Any, int]:
+        index = self._index
+        if index is None:
+            if self._key is None:
+                raise TypeError('the table has no key column')
+            col = self._cols[self._pos(self._key)]
+            index = dict(zip(col, range(len(col))))
+            if len(index) != len(col):
+                raise ValueError(f'duplicate keys in column {self._key!r}')
+            self._index = index
+        return index
+
+    def _rows(self, keys: Iterable[Any]) -> list[int]:
+        index = self._get_index()
+        return [index[k] for k in keys]
+
+    def _drop_index(self) -> None:
+        self._index = None
+
+    def _column_w(self, i: int) -> _column:
+        is_key = self._names[i] == self._key
+        return _column(self._cols[i], self._drop_index if is_key else None)
+
+    def _extend(self, rows: Iterable[_S]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        # NOTE: the new chunks are built first, so that a bad value (e.g. a
+        #   `str` in an `int` column) leaves the table unchanged
+        chunks = [
+            array(tc, values) if tc else list(values)
+            for tc, values in zip(self._typecodes, zip(*rows))
+        ]
+        if len(chunks) != len(self._cols):
+            raise ValueError(f'expected rows with {len(self._cols)} fields')
+        n = len(self)
+        for col, chunk in zip(self._cols, chunks):
+            col.extend(chunk)
+        index = self._index
+        if index is not None:
+            keys = chunks[self._pos(cast(str, self._key))]
+            index.update(zip(keys, range(n, n + len(keys))))
+            if len(index) != n + len(keys):
+                self._index = None      # duplicates: see `_get_index`
+
+    # R methods
+
+    @property
+    def schema(self) -> type[_S]:
+        return self._schema
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return self._names
+
+    def __len__(self) -> int:
+        return len(self._cols[0]) if self._cols else 0
+
+    def __getitem__(self, i: int, /) -> _S:
+        return self._schema._make([col[i] for col in self._cols])
+
+    def __iter__(self) -> Iterator[_S]:
+        return map(self._schema._make, zip(*self._cols))
+
+    def row_of(self, key: Any) -> _S:
+        return self[self._get_index()[key]]
+
+    def has_key(self, key: Any) -> bool:
+        return key in self._get_index()
+
+    def col(self, name: str) -> list_r[Any]:
+        col = self._cols[self._pos(name)]
+        return cast(list_r[Any], list_view(col, range(len(col))))
+
+    def copy(self) -> table_out[_S, WK]:
+        res = self._like()
+        res._cols = [col[:] for col in self._cols]
+        return res
+
+    def take(self, rows: Iterable[int]) -> table_out[_S, WK]:
+        """Returns the given rows as a new table."""
+        rows = rows if isinstance(rows, (list, range)) else list(rows)
+        res = self._like()
+        res._cols = [
+            array(tc, [col[i] for i in rows]) if tc else [col[i] for i in rows]
+            for tc, col in zip(self._typecodes, self._cols)
+        ]
+        return res
+
+    def gather(self, keys: Iterable[Any]) -> table_out[_S, WK]:
+        """Returns the rows with the given keys as a new table."""
+        return self.take(self._rows(keys))
+
+    def filter(self, name: str, pred: Callable[[Any], Any]
+               ) -> table_out[_S, WK]:
+        """Returns the rows whose `name` column satisfies `pred`."""
+        mask = list(map(pred, self._cols[self._pos(name)]))
+        res = self._like()
+        res._cols = [
+            array(tc, compress(col, mask)) if tc else list(compress(col, mask))
+            for tc, col in zip(self._typecodes, self._cols)
+        ]
+        return res
+
+    # W methods
+
+    def col_w(self: table_[_S, W, _L], name: str) -> _column:
+        return self._column_w(self._pos(name))
+
+    def append(self: table_[_S, W, _L], row: _S, /) -> None:
+        self._extend((row,))
+
+    def extend(self: table_[_S, W, _L], rows: Iterable[_S], /) -> None:
+        self._extend(rows)
+
+    def clear(self: table_[_S, W, _L]) -> None:
+        self._index = None
+        for col in self._cols:
+            del col[:]
+
+    def assign(self: table_[_S, W, _L], name: str, values: Iterable[Any],
+               keys: Iterable[Any] | None = None) -> None:
+        """Writes `values` to the `name` column, either all of it or, if
+        `keys` is given, the rows with those keys."""
+        i = self._pos(name)
+        if keys is None:
+            self._column_w(i)[:] = values
+            return
+        rows = self._rows(keys)
+        col = self._cols[i]
+        # NOTE: these may raise: nothing is written
+        if isinstance(col, array):
+            values = array(col.typecode, values)
+        elif not isinstance(values, list):
+            values = list(values)
+        if len(values) != len(rows):
+            raise ValueError(f'{len(values)} values for {len(rows)} keys')
+        if name == self._key:
+            self._index = None
+        for row, value in zip(rows, values):
+            col[row] = value
+
+    def scatter(self: table_[_S, W, _L], keys: Iterable[Any],
+                src: table_r[_S], names: Iterable[str] | None = None) -> None:
+        """Copies the `names` columns (by default, all the non-key ones) of
+        the rows with the given keys from `src`."""
+        keys = keys if isinstance(keys, list) else list(keys)
+        src_rows = src._rows(keys)
+        dst_rows = self._rows(keys)
+        if names is None:
+            names = [n for n in self._names if n != self._key]
+        names = list(names)
+        cols = [(self._cols[self._pos(n)], src._cols[src._pos(n)])
+                for n in names]
+        if self._key in names:
+            self._index = None
+        for dst, s in cols:
+            for d, i in zip(dst_rows, src_rows):
+                dst[d] = s[i]
+
+    def __eq__(self, value: object, /) -> bool:
+        if not isinstance(value, table_):
+            return NotImplemented
+        other = cast(table_[Any, Any, Any], value)
+        return self._names == other._names and self._cols == other._cols
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __repr__(self) -> str:
+        return f'table_({self._schema.__name__}, {list(self)!r})'
+
+def _bench(n: int = 100_000, frac: float = 0.1) -> None:
+    import random
+    import timeit
+    import tracemalloc
+    from typing import NamedTuple
+
+    class Rec(NamedTuple):
+        id: int
+        x: float
+        y: float
+        qty: int
+
+    rnd = random.Random(0)
+    recs = [Rec(i, rnd.random(), rnd.random(), rnd.randrange(100))
+            for i in range(n)]
+    keys = rnd.sample(range(n), int(n * frac))
+
+    def build_dicts() -> dict[int, dict[str, Any]]:
+        return {r.id: r._asdict() for r in recs}
+
+    def build_table() -> table_[Rec, WK, None]:
+        return table_[Rec, WK, None](Rec, recs, key='id')
+
+    def measure[T](f: Callable[[], T]) -> tuple[T, float]:
+        tracemalloc.start()
+        res = f()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return res, size / n
+
+    dd, dd_bytes = measure(build_dicts)
+    src_dd = build_dicts()
+    tt, tt_bytes = measure(build_table)
+    src_tt = build_table()
+
+    def update_dicts() -> None:
+        for k in keys:
+            d, s = dd[k], src_dd[k]
+            for f in ('x', 'y', 'qty'):
+                d[f] = s[f]
+
+    def update_table() -> None:
+        w(tt).scatter(keys, src_tt)
+
+    def assign_dicts() -> None:
+        for d, v in zip(dd.values(), range(n)):
+            d['qty'] = v
+
+    qty = array('q', range(n))
+
+    def assign_table() -> None:
+        w(tt).assign('qty', qty)
+
+    # NOTE: the dicts are indexed by key from the start, so the key index of
+    #   the tables is built before the timings too.
+    tt.has_key(0)
+    src_tt.has_key(0)
+
+    print(f'{n} records, {len(keys)} updated by key')
+    print(f'{"":>18} {"dict of dicts":>14} {"table_":>10} {"ratio":>7}')
+    print(f'{"bytes/record":>18} {dd_bytes:>14.0f} {tt_bytes:>10.0f} '
+          f'{dd_bytes / tt_bytes:>6.1f}x')
+    for name, fd, ft in (('scatter (ms)', update_dicts, update_table),
+                         ('assign (ms)', assign_dicts, assign_table)):
+        td = min(timeit.repeat(fd, number=1, repeat=7))
+        tt_ = min(timeit.repeat(ft, number=1, repeat=7))
+        print(f'{name:>18} {td * 1e3:>14.2f} {tt_ * 1e3:>10.2f} '
+              f'{td / tt_:>6.1f}x')
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--bench']:
+        _bench()
+    else:
+        from typing import NamedTuple, assert_type
+
+        class Item(NamedTuple):
+            sku: str
+            price: float
+            qty: int
+
+        t = table_[Item, WK, None](Item, [Item('a', 1.5, 3), Item('b', 2.0, 0)],
+                                   key='sku')
+        assert type(t) is table_ and len(t) == 2
+        assert_type(t[0], Item)
+        assert t[1] == Item('b', 2.0, 0) and t.row_of('a').qty == 3
+        assert type(t._cols[1]) is array and type(t._cols[0]) is list  # pyright: ignore[reportPrivateUsage]
+        prices = t.col('price')
+        assert_type(prices, list_r[Any])
+        assert list(prices) == [1.5, 2.0]
+
+        t_w = w(t)
+        t_w.append(Item('c', 4.0, 7))
+        t_w.extend([Item('d', 0.5, 1)])
+        assert t.has_key('d') and len(t) == 4
+        t_w.col_w('qty')[1] = 5
+        t_w.assign('price', [9.0, 8.0], keys=['d', 'a'])
+        assert t.row_of('a') == Item('a', 8.0, 3) and t[3].price == 9.0
+        t_w.assign('qty', [0, 0, 0, 0])
+        assert list(t.col('qty')) == [0, 0, 0, 0]
+        try:
+            t_w.col_w('qty')[:] = [1]
+        except ValueError:
+            pass
+        else:
+            assert False
+        assert len(t.col('qty')) == 4
+
+        cheap = t.filter('price', lambda p: p < 5)
+        assert_type(cheap, table_[Item, WK, None])
+        assert [x.sku for x in cheap] == ['b', 'c']
+        assert list(t.gather(['c', 'a'])) == [t[2], t[0]]
+
+        src = t.copy()
+        w(src).assign('qty', [10, 20], keys=['a', 'c'])
+        t_w.scatter(['c'], r(src))
+        assert t.row_of('c').qty == 20 and t.row_of('a').qty == 0
+
+        t_w.col_w('sku')[0] = 'z'           # the index is rebuilt
+        assert t.row_of('z').price == 8.0 and not t.has_key('a')
+
+        # a failed write leaves the table (and its index) unchanged
+        before = t.copy()
+        bad_row = Item('f', 2.0, 'x')       # pyright: ignore[reportArgumentType]
+        for bad in (lambda: t_w.extend([Item('e', 1.0, 1), bad_row]),
+                    lambda: t_w.assign('qty', [1, 'x'], keys=['z', 'b']),
+                    lambda: t_w.assign('qty', [1], keys=['nope']),
+                    lambda: t_w.assign('qty', [1, 2], keys=['z']),
+                    lambda: t_w.assign('qty', [1], keys=['z', 'b'])):
+            try:
+                bad()
+            except (TypeError, KeyError, ValueError):
+                pass
+            else:
+                assert False
+            assert t == before and not t.has_key('e') and t.has_key('z')
+
+        # duplicate keys are rejected by the keyed operations
+        t_w.append(Item('b', 1.0, 1))
+        try:
+            t.row_of('z')
+        except ValueError:
+            pass
+        else:
+            assert False
+        t_w.col_w('sku')[len(t) - 1] = 'e'
+        assert t.row_of('e').qty == 1
+
+        t_w.clear()
+        assert len(t) == 0 and not t.has_key('z')
+
+        wrong = False
+        if wrong:
+            t.append(Item('e', 1.0, 1))     # type: ignore      needs explicit permission
+            r(t).assign('qty', [1, 2, 3, 4])  # type: ignore    read-only
+            r(t).col_w('qty')               # type: ignore      read-only
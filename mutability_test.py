@@ -4,6 +4,7 @@ from mutability_list import *
 from mutability_set import *
 from mutability_dict import *
 from mutability import *
+from mutability_dispatch import mode_dispatch
 
 # NOTE: This is just to better separate wrong code from good one.
 wrong = False
@@ -14,37 +15,39 @@ def get_sum(xs: list_r[int]) -> int:
         xs.sort()       # type: ignore      xs is read-only
     return sum(xs)
 
+# NOTE: With `@mode_dispatch`, the overloads are the implementations.
 @overload
-def doubled(xs: list_r[int]) -> list_out[int, WK]: ...
+def doubled(xs: list_r[int]) -> list_out[int, WK]:
+    xs2 = lift([x * 2 for x in xs])                     # WK by default
+    assert_type(xs2, list_[int, WK, None])
+    return xs2
 @overload
-def doubled[K](xs: dict_r[K, int]) -> dict_out[K, int, WK]: ...
-def doubled[K](xs: list_r[int] | dict_r[K, int]) -> Any:
-    if isinstance(xs, dict_):       # dict_ = dict at runtime
-        xs2 = lift({k: v * 2 for k, v in xs.items()})       # WK by default
-        assert_type(xs2, dict_[K, int, WK, None])
-    else:
-        xs2 = lift([x * 2 for x in xs])                     # WK by default
-        assert_type(xs2, list_[int, WK, None])
+def doubled[K](xs: dict_r[K, int]) -> dict_out[K, int, WK]:
+    xs2 = lift({k: v * 2 for k, v in xs.items()})       # WK by default
+    assert_type(xs2, dict_[K, int, WK, None])
     return xs2
+@mode_dispatch
+def doubled(xs: Any) -> Any:
+    raise TypeError(f'unsupported type: {type(xs).__name__}')
 
 class _L1: ...          # lock
 @overload
-def double(xs: list_[int, W, _L1]) -> None: ...
+def double(xs: list_[int, W, _L1]) -> None:
+    xs_w = w(xs)            # explicit permission
+    for i in range(len(xs)):    # pylint: disable=C0200
+        if wrong:
+            xs[i] *= 2      # type: ignore      needs explicit permission
+        xs_w[i] *= 2
 @overload
-def double(xs: dict_[Any, int, W, _L1]) -> None: ...
-def double(xs: list_[int, W, _L1] | dict_[Any, int, W, _L1]) -> None:
-    if isinstance(xs, dict_):   # dict_ = dict at runtime
-        xs_w = w(xs)            # explicit permission
-        for k in xs.keys():
-            if wrong:
-                xs[k] *= 2      # type: ignore      needs explicit permission
-            xs_w[k] *= 2
-    else:
-        xs_w = w(xs)            # explicit permission
-        for i in range(len(xs)):    # pylint: disable=C0200
-            if wrong:
-                xs[i] *= 2      # type: ignore      needs explicit permission
-            xs_w[i] *= 2
+def double(xs: dict_[Any, int, W, _L1]) -> None:
+    xs_w = w(xs)            # explicit permission
+    for k in xs.keys():
+        if wrong:
+            xs[k] *= 2      # type: ignore      needs explicit permission
+        xs_w[k] *= 2
+@mode_dispatch
+def double(xs: Any) -> None:
+    raise TypeError(f'unsupported type: {type(xs).__name__}')
 
 class _L2: ...          # lock
 def update_keys(src: dict_r[str, int], dest: dict_[str, int, W, _L2],
@@ -0,0 +1,239 @@
+from __future__ import annotations
+import sys
+from collections.abc import Mapping
+from typing import (
+    TYPE_CHECKING, Any, ClassVar, Iterator, Sequence, SupportsIndex
+)
+
+from mutability import *
+from mutability_list import *
+from mutability_dict import *
+
+__all__ = ['r_slice', 'r_merge', 'list_view', 'merged_view']
+
+# NOTE:
+# * Slicing a `list_` returns a `list_out[T, WK]`, i.e. an O(k) copy. When
+#   we only need to read the slice, `r_slice` returns an O(1) view instead,
+#   typed as a `list_r[T]`.
+# * A view is a base sequence plus a `range` of indices. Since slicing a
+#   `range` is O(1) and composes starts, stops and strides, so does
+#   `r_slice` on a view.
+# * Like any R value, a view is temporary: it must not be used after the base
+#   is resized.
+# * A view is NOT a `list` (or a `dict`) at runtime, so `isinstance(view,
+#   list_)` is false. Code that accepts R values at runtime must test for
+#   `Sequence` or `Mapping` instead (e.g. `stream`); `mode_dispatch` knows
+#   the view classes.
+# * `r_merge(a, b, c)` is the O(1)-lookup view version of `a | b | c`. The
+#   first map is the base (e.g. the defaults) and is NOT scanned: the
+#   construction only scans the other ones (e.g. tenant and request
+#   settings) to find which map owns each of their keys.
+
+class list_view:
+    """O(1) view of `base[i] for i in rng` (see `r_slice`)."""
+    __slots__ = ('_base', '_range')
+
+    _base: Sequence[Any]
+    _range: range
+
+    def __init__(self, base: Sequence[Any], rng: range) -> None:
+        self._base = base
+        self._range = rng
+
+    def copy(self) -> list[Any]:
+        return list(self)
+
+    def index(self, value: Any, start: SupportsIndex = 0,
+              stop: SupportsIndex = sys.maxsize, /) -> int:
+        base = self._base
+        rng = self._range
+        for i in range(*slice(start, stop).indices(len(rng))):
+            x = base[rng[i]]
+            if x is value or x == value:
+                return i
+        raise ValueError(f'{value!r} is not in list')
+
+    def count(self, value: Any, /) -> int:
+        return sum(1 for x in self if x is value or x == value)
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self._base.__getitem__, self._range)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return map(self._base.__getitem__, reversed(self._range))
+
+    def __getitem__(self, s: Any, /) -> Any:
+        if isinstance(s, slice):
+            # NOTE: slicing returns a `list_out[T, WK]`, so we must copy
+            return list(map(self._base.__getitem__, self._range[s]))
+        return self._base[self._range[s]]
+
+    def __contains__(self, key: object, /) -> bool:
+        return any(x is key or x == key for x in self)
+
+    __hash__: ClassVar[None]    # pyright: ignore[reportIncompatibleMethodOverride]
+
+    def __add__(self, value: Any, /) -> list[Any]:
+        res = list(self)
+        res.extend(value)
+        return res
+
+    def __mul__(self, value: SupportsIndex, /) -> list[Any]:
+        return list(self) * value
+
+    __rmul__ = __mul__
+
+    def __eq__(self, value: object, /) -> bool:
+        if not isinstance(value, (list, list_view)):
+            return NotImplemented
+        return len(self) == len(value) and all(
+            x is y or x == y for x, y in zip(self, value))
+
+    def __lt__(self, value: Any, /) -> bool:
+        return list(self) < list(value)
+
+    def __le__(self, value: Any, /) -> bool:
+        return list(self) <= list(value)
+
+    def __gt__(self, value: Any, /) -> bool:
+        return list(self) > list(value)
+
+    def __ge__(self, value: Any, /) -> bool:
+        return list(self) >= list(value)
+
+    def __repr__(self) -> str:
+        return f'r_slice({list(self)!r})'
+
+class merged_view(Mapping[Any, Any]):
+    """O(1)-lookup view of `maps[0] | maps[1] | ...` (see `r_merge`)."""
+    __slots__ = ('_base', '_maps', '_owner', '_len')
+
+    _base: Mapping[Any, Any]
+    _maps: tuple[Mapping[Any, Any], ...]
+    _owner: dict[Any, int]          # key -> index of the last map with it
+    _len: int
+
+    def __init__(self, maps: tuple[Mapping[Any, Any], ...]) -> None:
+        base = maps[0]
+        owner: dict[Any, int] = {}
+        for i in range(1, len(maps)):
+            for k in maps[i]:
+                owner[k] = i
+        self._base = base
+        self._maps = maps
+        self._owner = owner
+        self._len = len(base) + sum(1 for k in owner if k not in base)
+
+    def copy(self) -> dict[Any, Any]:
+        res = dict(self._base)
+        for m in self._maps[1:]:
+            res.update(m)
+        return res
+
+    def get(self, key: Any, default: Any = None, /) -> Any:
+        i = self._owner.get(key)
+        if i is None:
+            return self._base.get(key, default)
+        return self._maps[i][key]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, key: Any, /) -> Any:
+        i = self._owner.get(key)
+        if i is None:
+            return self._base[key]
+        return self._maps[i][key]
+
+    def __contains__(self, key: object, /) -> bool:
+        return key in self._owner or key in self._base
+
+    def __iter__(self) -> Iterator[Any]:
+        # NOTE: same order as `a | b | ...`
+        base = self._base
+        yield from base
+        for k in self._owner:
+            if k not in base:
+                yield k
+
+    def __reversed__(self) -> Iterator[Any]:
+        return reversed(list(self))
+
+    def __or__(self, value: Any, /) -> dict[Any, Any]:
+        res = self.copy()
+        res.update(value)
+        return res
+
+    def __ror__(self, value: Any, /) -> dict[Any, Any]:
+        res = dict(value)
+        res.update(self.items())
+        return res
+
+    def __repr__(self) -> str:
+        return f'r_merge({self.copy()!r})'
+
+if TYPE_CHECKING:
+    def r_slice[T](xs: list_r[T], start: SupportsIndex | None = None,
+                   stop: SupportsIndex | None = None,
+                   step: SupportsIndex | None = None) -> list_r[T]:
+        """O(1) R-only version of `xs[start:stop:step]`."""
+        ...             # pylint: disable=W2301
+else:
+    def r_slice(xs, start=None, stop=None, step=None):
+        s = slice(start, stop, step)
+        if type(xs) is list_view:
+            return list_view(xs._base, xs._range[s])
+        return list_view(xs, range(len(xs))[s])
+
+if TYPE_CHECKING:
+    def r_merge[K, V](base: dict_r[K, V], /, *maps: dict_r[K, V]
+                      ) -> dict_r[K, V]:
+        """O(1)-lookup R-only version of `base | maps[0] | maps[1] | ...`."""
+        ...             # pylint: disable=W2301
+else:
+    def r_merge(base, /, *maps):
+        if not maps:
+            return base
+        return merged_view((base,) + maps)
+
+if __name__ == "__main__":
+    from typing import assert_type
+
+    xs = lift(list(range(100)))
+    v = r_slice(xs, 10, 90)
+    assert_type(v, list_[int, R, Any])
+    assert len(v) == 80 and v[0] == 10 and v[-1] == 89
+    wrong = False
+    if wrong:
+        v[0] = 1                # type: ignore      read-only
+
+    v2 = r_slice(v, 5, None, 3)
+    assert list(v2) == xs[15:90:3] and v2 == xs[15:90:3]
+    v3 = r_slice(v2, None, None, -1)
+    assert list(v3) == xs[15:90:3][::-1]
+    assert v3._base is xs       # pyright: ignore      no nested views
+
+    assert 40 in v and 5 not in v
+    assert v.index(12) == 2 and v.count(12) == 1
+    assert_type(v[1:3], list_[int, WK, None])
+    assert v[1:3] == [11, 12] and type(v[1:3]) is list
+    assert sum(r_slice(xs, -3)) == 97 + 98 + 99
+
+    defaults = lift({f'k{i}': i for i in range(1000)})
+    tenant = lift({'k1': -1, 'extra': 7})
+    request = lift({'k1': -2, 'k2': -2})
+    cfg = r_merge(defaults, tenant, request)
+    assert_type(cfg, dict_[str, int, R, Any])
+    expected = defaults | tenant | request
+    assert len(cfg) == len(expected) == 1001
+    assert cfg['k1'] == -2 and cfg['k2'] == -2 and cfg['extra'] == 7
+    assert cfg.get('missing') is None and 'k999' in cfg
+    assert list(cfg) == list(expected) and dict(cfg.items()) == expected
+    cfg_wk = cfg.copy()
+    assert_type(cfg_wk, dict_[str, int, WK, None])
+    assert cfg_wk == expected and type(cfg_wk) is dict
+    if wrong:
+        cfg['k1'] = 0           # type: ignore      read-only